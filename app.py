@@ -9,22 +9,46 @@ Description: User-Friendly GUI to interact with StudyTime functionality
 # GUI Handling
 from PyQt6.QtWidgets import (QMainWindow, QApplication, QWidget, QLabel, QPushButton, QHBoxLayout, QVBoxLayout,
                              QGridLayout, QLineEdit, QCalendarWidget, QTextEdit, QDialog, QDateEdit, QTimeEdit,
-                             QComboBox, QGroupBox, QScrollArea, QTableWidget, QTableWidgetItem, QCheckBox, QCompleter, QMessageBox)
-from PyQt6.QtCore import Qt, QDate, QTime, QStringListModel
-from PyQt6.QtGui import QFont, QIcon
+                             QComboBox, QGroupBox, QScrollArea, QTableView, QHeaderView, QCheckBox, QCompleter, QMessageBox)
+from PyQt6.QtCore import (Qt, QDate, QTime, QStringListModel, QAbstractTableModel, QModelIndex, QObject, QRunnable,
+                          QThreadPool, QTimer, pyqtSignal)
+from PyQt6.QtGui import QFont, QIcon, QColor, QPainter, QAction
 
-import sys
+import bisect, sys
 from functools import partial
 from studytime.core import *
+from studytime import instrument
 
 def get_data(file: str):
     """
-    Creates a Save Instance object to interact with the user's data
+    Creates a Save Instance object to interact with the user's data. Changes are written in the background, so the
+    GUI never waits on the disk
     """
-    data = SaveInstance(file)
+    data = SaveInstance(file, write_behind=0.5)
 
     return data
 
+class NameListSignals(QObject):
+    finished = pyqtSignal(list)
+
+class NameListWorker(QRunnable):
+    """
+    Collects and sorts every item name off the GUI thread, for building the search bar's completer
+    """
+    def __init__(self, data):
+        super().__init__()
+        self.data = data
+        self.signals = NameListSignals()
+
+    def run(self):
+        self.data.load_all() # Years are loaded one at a time, so the GUI thread is never locked out for long
+
+        with self.data.lock: # Stops the index changing underneath us while the names are copied out
+            names = self.data.search.names()
+
+        names.sort(key=str.lower)
+        self.signals.finished.emit(names)
+
 class MainWindow(QMainWindow):
     """
     The main application window; will show the current view, as well as item data
@@ -32,19 +56,36 @@ class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
 
+        self.data = get_data("dates") # Shared by every dialog for as long as the window is open
+
         layout = QGridLayout() # Parent Layout
         layout.setColumnStretch(1, 2)
 
         info_layout = QVBoxLayout() # Information Box Layout
 
+        self.search_timer = QTimer(self) # Debounces keystrokes so only a pause in typing reaches update_search_bar
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.update_search_bar)
+
         self.search_bar = QLineEdit(self)
-        self.search_bar.textChanged.connect(self.update_search_bar)
+        self.search_bar.textChanged.connect(lambda: self.search_timer.start()) # Restarts the countdown on every keystroke
         self.search_bar.returnPressed.connect(self.editing_finished)
 
-        self.search_results = QCompleter(self)
+        self.search_names = set() # Names currently in the completer model
+        self.names_loaded = False # Built on first use, so years aren't loaded until someone searches
+        self.names_building = False
+        self.names_stale = False
+
+        self.search_model = QStringListModel(self)
+        self.search_results = QCompleter(self.search_model, self)
         self.search_results.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
         self.search_bar.setCompleter(self.search_results)
 
+        self.data.add_listener(self.update_search_names)
+        self.data.reconcile_notifications() # Drops reminders for items removed while the app was closed
+        self.data.get_notifications().start() # Shows reminders for as long as the app is open, including ones missed while it was closed
+
         self.header_font = QFont("Helvetica", 13)
         self.header_font.setBold(True)
 
@@ -68,7 +109,7 @@ class MainWindow(QMainWindow):
         info_layout.setStretch(2, 4)
         self.info_box.setLayout(info_layout)
 
-        self.date = QCalendarWidget(self)
+        self.date = StudyCalendar(self.data, self)
         self.date.clicked.connect(self.data_clicked) # Calls whenever the user selects a different date
         self.date.selectionChanged.connect(self.data_clicked)
         
@@ -79,7 +120,7 @@ class MainWindow(QMainWindow):
         layout.addWidget(self.info_box, 1, 0, 1, 1)
         layout.addWidget(self.date, 1, 1, 1, 1)
 
-        self.data = self.data_clicked() # Called in order to set the information sidebar to the current date
+        self.data_clicked() # Called in order to set the information sidebar to the current date
 
         main_widget = QWidget()
         main_widget.setLayout(layout)
@@ -87,8 +128,45 @@ class MainWindow(QMainWindow):
         self.setCentralWidget(main_widget)
 
         self.setWindowTitle("StudyTime")
+
+        if instrument.ENABLED: # Only there when the app was started with profiling on
+            self.create_debug_menu()
         self.showMaximized()
 
+    def create_debug_menu(self):
+        """
+        Adds a Debug menu for looking at, saving and clearing the profiling stats while the app runs
+        """
+        menu = self.menuBar().addMenu("Debug")
+
+        menu.addAction(QAction("Show Profiling Stats", self, triggered=self.show_profile))
+        menu.addAction(QAction("Save Profiling Stats", self, triggered=self.dump_profile))
+        menu.addAction(QAction("Reset Profiling Stats", self, triggered=instrument.reset))
+
+    def show_profile(self):
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Profiling Stats")
+        dialog.resize(900, 500)
+
+        text = QTextEdit(dialog)
+        text.setReadOnly(True)
+        text.setFont(QFont("Courier New", 10))
+        text.setPlainText(instrument.report())
+
+        layout = QVBoxLayout(dialog)
+        layout.addWidget(text)
+
+        dialog.show()
+
+    def dump_profile(self):
+        try:
+            path = instrument.dump()
+        except OSError as error:
+            QMessageBox(QMessageBox.Icon.Critical, "Error", f"Couldn't save the stats: {error}", parent=self).show()
+            return
+
+        QMessageBox(QMessageBox.Icon.Information, "Profiling Stats", f"Saved to {path}", parent=self).show()
+
     def create_item_dialog(self):
         """
         Creates and displays a dialog for the user to add a new item
@@ -100,20 +178,25 @@ class MainWindow(QMainWindow):
         """
         Slot function that updates the info sidebar whenever the user selects a new date
         """
-        data = get_data("dates")
+        reloaded = self.data.refresh() # Only reloads if something outside the app has changed the save file
+        if reloaded and self.names_loaded:
+            self.build_search_names()
 
         date = self.date.selectedDate().toPyDate() # Converts the selected date of the calendar to a Datetime object
 
-        self.update_info_text(date, data.search_date(date))
-        return data
+        self.update_info_text(date, reloaded)
     
-    def update_info_text(self, date: datetime, data):
+    def update_info_text(self, date: datetime, reloaded: bool = False):
         """
-        Changes the information sidebar to display relevant date information
+        Changes the information sidebar to display relevant date information. Changes made through the save update
+        the sidebar by themselves, so it's only refilled when the date changes or the save has been reloaded
         """
         self.date_header.setText(f"Date: {date.strftime('%d/%m/%Y')}\n") # Displays the current date as text
 
-        self.info_scroll.update(data)
+        self.info_scroll.model.show_date(date, reloaded)
+
+        if reloaded: # The calendar's counts belong to the old copy of the save too
+            self.date.reload()
 
     def open_item_details(self, item):
         """
@@ -123,38 +206,227 @@ class MainWindow(QMainWindow):
     
     def update_search_bar(self):
         """
-        Updates search results whenever the user updates their query
+        Runs once the user pauses typing, picking up any outside changes to the save file
         """
-        data = []
+        reloaded = self.data.refresh()
+        if reloaded: # The sidebar's rows belong to the old copy of the save
+            self.update_info_text(self.date.selectedDate().toPyDate(), reloaded)
 
-        for date in self.data.scan_items():
-            data.append([item["name"] for item in date["data"]])
-        
-        data = [item for sublist in data for item in sublist] # Flattens the list
-        model = QStringListModel(data)
-        
-        self.search_results.setModel(model)
+        if reloaded or not self.names_loaded:
+            self.build_search_names()
+
+    def build_search_names(self):
+        """
+        Rebuilds the completer's list of names on a background thread
+        """
+        if self.names_building: # The running build may have missed changes, so it gets redone once it finishes
+            self.names_stale = True
+            return
+
+        self.names_loaded = True
+        self.names_building = True
+        self.names_stale = False
+
+        self.names_worker = NameListWorker(self.data) # Reference kept so the signals object outlives the thread
+        self.names_worker.signals.finished.connect(self.set_search_names)
+        QThreadPool.globalInstance().start(self.names_worker)
+
+    def set_search_names(self, names: list):
+        """
+        Slot for NameListWorker; swaps the finished list into the completer
+        """
+        self.names_building = False
+        self.search_names = set(names)
+        self.search_model.setStringList(names)
+
+        if self.names_stale:
+            self.build_search_names()
+
+    def update_search_names(self, record: dict):
+        """
+        Listener for save changes; adds or removes a single completer row rather than rebuilding the list
+        """
+        if not self.names_loaded:
+            return
+
+        if self.names_building:
+            self.names_stale = True
+            return
+
+        if record["op"] == "rule": # Recurring items are searched by the name they repeat under
+            record = {"op": "add", "item": record["rule"]["item"]}
+
+        if record["op"] in ("add", "edit") and record["item"]["name"] not in self.search_names:
+            name = record["item"]["name"]
+            row = self.search_model.rowCount()
+
+            self.search_model.insertRows(row, 1)
+            self.search_model.setData(self.search_model.index(row), name)
+            self.search_names.add(name)
+
+        if record["op"] in ("remove", "edit", "unrule") and not self.data.search.has_name(record["name"]): # Last item with this name has gone
+            row = self.search_model.stringList().index(record["name"])
+
+            self.search_model.removeRows(row, 1)
+            self.search_names.discard(record["name"])
     
     def editing_finished(self):
         """
         Takes the user to whatever item corresponds to the current search query. If no matches exist, nothing happens
         """
-        item = self.data.search_name(self.search_bar.text())[0]
+        results = self.data.search_name(self.search_bar.text(), limit=1)
+        if results == []:
+            return
+
+        item = results[0]
         date = datetime.strptime(item["date"], "%m/%d/%Y")
 
         self.date.setSelectedDate(QDate.fromString(item["date"], "MM/dd/yyyy"))
-        self.update_info_text(date, self.data.search_date(date))
+        self.update_info_text(date)
+
+class StudyCalendar(QCalendarWidget):
+    """
+    Calendar that marks each day with how many items it holds, in red if any are still incomplete. Counts come from
+    the save's month aggregates, so a page costs one lookup per month shown rather than a search per day
+    """
+    def __init__(self, data: SaveInstance, parent=None):
+        super().__init__(parent)
+
+        self.data = data
+        self.summaries = {} # (year, month) -> that month's aggregates, for the months on the current page
+
+        self.currentPageChanged.connect(lambda year, month: self.summaries.clear())
+        data.add_listener(lambda record: self.reload()) # Aggregates are already updated; the cells just need repainting
+
+    def reload(self):
+        """
+        Drops the held aggregates after the save has been reloaded, and repaints with the new ones
+        """
+        self.summaries.clear()
+        self.updateCells()
+
+    def paintCell(self, painter: QPainter, rect, date: QDate):
+        super().paintCell(painter, rect, date)
+
+        month = (date.year(), date.month())
+        if month not in self.summaries:
+            self.summaries[month] = self.data.month_summary(*month)
+
+        counts = self.summaries[month].get(date.day())
+        if counts is None:
+            return
+
+        painter.save()
+        painter.setPen(QColor("#c0392b") if counts["incomplete"] else QColor("#2e86c1"))
+
+        font = painter.font()
+        font.setPointSizeF(font.pointSizeF() * 0.75)
+        painter.setFont(font)
+
+        painter.drawText(rect.adjusted(2, 1, -3, -1), Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignBottom, f"{counts['items']}")
+        painter.restore()
+
+class DayModel(QAbstractTableModel):
+    """
+    Table model over one date's items in the save. Rows are only formatted when the view paints them, and changes to
+    the save insert or remove single rows instead of rebuilding the table
+    """
+    def __init__(self, data: SaveInstance, parent=None):
+        super().__init__(parent)
+
+        self.data_source = data
+        self.key = None # (year, month, day) being shown
+        self.rows = [] # The date's items, in the same order as the save keeps them
+
+        data.add_listener(self.record_changed)
+
+    def show_date(self, date: datetime, reloaded: bool = False):
+        """
+        Switches the model to another date. Showing the same date again does nothing, unless the save was reloaded
+        """
+        key = (date.year, date.month, date.day)
+        if key == self.key and not reloaded:
+            return
+
+        self.beginResetModel()
+        self.key = key
+        self.rows = self.data_source.search_date(date)
+        self.endResetModel()
+
+    def item_at(self, row: int):
+        return self.rows[row]
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else 1
+
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+
+        item = self.rows[index.row()]
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            return f"{item.name}: {item.time}"
+
+        if role == Qt.ItemDataRole.UserRole:
+            return item
+
+        return None
+
+    def flags(self, index: QModelIndex):
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable # Not editable in place
+
+    def record_changed(self, record: dict):
+        """
+        Listener for save changes; moves the rows of any item leaving or joining the date being shown
+        """
+        if self.key is None or record["op"] == "add" and date_key(record["date"]) != self.key:
+            return
+
+        if record["op"] in ("rule", "unrule"): # Could change any number of days, so the date is just shown afresh
+            self.show_date(datetime(*self.key), True)
+            return
+
+        if record["op"] in ("remove", "edit") and date_key(record["date"]) == self.key:
+            row = next((row for row, item in enumerate(self.rows) if item.id == record["id"]), None)
+
+            if row is not None:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self.rows[row]
+                self.endRemoveRows()
+
+        if date_key(record.get("to", record["date"])) == self.key and record["op"] != "remove":
+            item = self.data_source.get_item(record.get("id") or record["item"].get("id"))
+            if item is None or item in self.rows: # Already gone again, within the same batch
+                return
+
+            row = bisect.bisect_right(self.rows, item.time, key=lambda x : x.time) # Same place the save files it
+
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.rows.insert(row, item)
+            self.endInsertRows()
 
 class InfoWrapper(QScrollArea):
     def __init__(self, parent):
         super().__init__(parent)
         layout = QVBoxLayout()
 
-        self.table = QTableWidget(0, 1, self)
-        self.table.cellDoubleClicked.connect(lambda: self.parent.open_item_details(self.date[f"{self.table.currentItem()}"]))
+        self.model = DayModel(parent.data, self)
+
+        self.table = QTableView(self)
+        self.table.setModel(self.model)
+        self.table.doubleClicked.connect(lambda index: self.parent.open_item_details(self.model.item_at(index.row())))
         self.table.setShowGrid(False) # Removes cell borders
+        self.table.setFocusPolicy(Qt.FocusPolicy.NoFocus) # Removes the outline that appears when a cell is clicked
         self.table.horizontalScrollBar().setEnabled(False) # Disabling scroll bar
 
+        # Fixed row heights and a stretched column, so nothing is measured per item
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+
         # Removing the headers from the table
         self.table.horizontalHeader().hide()
         self.table.verticalHeader().hide()
@@ -164,21 +436,6 @@ class InfoWrapper(QScrollArea):
 
         self.setLayout(layout)
         self.parent = parent
-    
-    def update(self, data):
-        self.table.clear()
-        self.table.setRowCount(len(data))
-        self.table.setFocusPolicy(Qt.FocusPolicy.NoFocus) # Removes the outline that appears when a cell is clicked
-        self.date = {}
-
-        for idx, item in enumerate(data):
-            cell = QTableWidgetItem(f"{item['name']}: {item['time']}")
-            cell.setFlags(~Qt.ItemFlag.ItemIsEditable)
-
-            self.date[f"{cell}"] = item
-            self.table.setItem(idx, 0, cell)
-        
-        self.table.resizeColumnsToContents()
 
 class ItemDetailDialog(QDialog):
     def __init__(self, parent, item):
@@ -186,7 +443,7 @@ class ItemDetailDialog(QDialog):
 
         self.window = parent
         self.item = item
-        self.setWindowTitle(f"{item['type']} Info")
+        self.setWindowTitle(f"{item.type.value} Info")
 
         layout = QGridLayout(self)
 
@@ -194,7 +451,7 @@ class ItemDetailDialog(QDialog):
         name_label = QLabel("Item Name", self)
         name_label.setFont(parent.header_font)
 
-        self.name_text = QLineEdit(item["name"], self)
+        self.name_text = QLineEdit(item.name, self)
         self.name_text.setReadOnly(True)
 
         # Subgrid for Column 1
@@ -203,7 +460,7 @@ class ItemDetailDialog(QDialog):
         time_label = QLabel("Time", self)
         time_label.setFont(parent.header_font)
 
-        self.time_text = QTimeEdit(QTime.fromString(item["time"], "HH:mm:ss"), self)
+        self.time_text = QTimeEdit(QTime(item.time.hour, item.time.minute, item.time.second), self)
         self.time_text.setReadOnly(True)
 
         date_label = QLabel("Date")
@@ -225,10 +482,7 @@ class ItemDetailDialog(QDialog):
         self.type.currentIndexChanged.connect(self.event_toggle)
         self.type.setEnabled(False)
 
-        try:
-            self.subject_input.setCurrentText(item["subject"])
-        except KeyError: # KeyError thrown if the item is an event
-            self.subject_input.setCurrentText("None")
+        self.subject_input.setCurrentText(item.subject or "None") # Events don't have a subject
         
         self.subject_input.setEnabled(False)
 
@@ -310,15 +564,14 @@ class ItemDetailDialog(QDialog):
         Removes the currently selected item
         """
         date = self.window.date.selectedDate().toPyDate()
-        time = datetime.strptime(item["time"], "%H:%M:%S").time()
 
-        self.window.data.remove_item(item["name"], datetime(date.year, date.month, date.day, time.hour, time.minute, time.second))
-        self.window.update_info_text(date, self.window.data.search_date(date))
+        self.window.data.remove_item(item.id) # Its notifications go with it
+        self.window.update_info_text(date)
         self.close()
     
     def submit(self):
         """
-        Removes the currently selected item and replaces it with a new one as defined in the dialog inputs
+        Edits the currently selected item in place to match the dialog inputs
         """
         item_data = self.get_inputs()
 
@@ -329,22 +582,23 @@ class ItemDetailDialog(QDialog):
             dialog = QMessageBox(QMessageBox.Icon.Critical, "Error","Please select a subject and try again.", parent=self)
             dialog.show()
         else:
-            self.remove_item(item_data)
             date = item_data["date"].toPyDate()
             time = item_data["time"].toPyTime()
 
             item_datetime = datetime(date.year, date.month, date.day, time.hour, time.minute, 0)
 
-            func = [
-                partial(self.window.data.add_task, subject = item_data["subject"]), # Subject is a necessary argument for this function, but it's not needed for all versions so it's passed here
-                partial(self.window.data.add_event),
-                partial(self.window.data.add_assignment, subject = item_data["subject"]) # See above
-            ]
+            types = [ItemType.TASK, ItemType.EVENT, ItemType.ASSIGNMENT]
 
-            func[item_data["type"]](item_data["name"], item_datetime) # Selects the relevant add function from studytime.core, and passes arguments
+            # Keeps the item's ID, so its notifications follow it with the same lead time
+            self.window.data.edit_item(self.item.id, {
+                "name": item_data["name"],
+                "type": types[item_data["type"]],
+                "subject": item_data["subject"] if item_data["type"] != 1 else None,
+                "date": item_datetime
+            })
 
             self.window.date.setSelectedDate(item_data["date"])
-            self.window.update_info_text(item_datetime, self.window.data.search_date(item_datetime))
+            self.window.update_info_text(item_datetime)
             self.close()
     
     def open_notification_dialog(self):
@@ -368,6 +622,8 @@ class NotificationDialog(QDialog):
         super().__init__(parent)
         self.window = parent.window
 
+        self.item_id = parent.item.id # The saved item the notification belongs to, rather than the dialog's inputs
+
         self.setWindowTitle("New Notification")
         layout = QGridLayout(self)
 
@@ -402,7 +658,7 @@ class NotificationDialog(QDialog):
     
     def submit(self, item):
         """
-        Creates a notification in task scheduler whenever the submit button is pressed
+        Queues a notification with the reminder scheduler whenever the submit button is pressed
         """
 
         date = self.date_input.date()
@@ -410,7 +666,7 @@ class NotificationDialog(QDialog):
 
         date_time = datetime(date.year(), date.month(), date.day(), time.hour(), time.minute(), 0)
 
-        self.window.data.set_notification(item, date_time, self.description_input.toPlainText())
+        self.window.data.set_notification(self.item_id, date_time, self.description_input.toPlainText())
         self.close()
 
 class NewItemDialog(QDialog):
@@ -549,12 +805,23 @@ class NewItemDialog(QDialog):
             func[item_data["type"]](item_data["name"], item_datetime) # Selects the relevant add function from studytime.core, and passes arguments
 
             self.window.date.setSelectedDate(item_data["date"])
-            self.window.update_info_text(item_datetime, self.window.data.search_date(item_datetime))
+            self.window.update_info_text(item_datetime)
             self.close()
 
         
+# Timed when instrumentation is on, along with the hot paths registered in studytime.core
+instrument.register(MainWindow, "data_clicked", "update_info_text", "build_search_names", "editing_finished")
+instrument.register(StudyCalendar, "paintCell")
+instrument.register(DayModel, "show_date", "record_changed")
+
 if __name__ == "__main__":
+    profile = next((arg.partition("=")[2] or "timing" for arg in sys.argv[1:] if arg.startswith("--profile")), None)
+    if profile is not None: # e.g. --profile or --profile=timing,cprofile; STUDYTIME_PROFILE works too
+        instrument.enable(profile)
+
     app = QApplication(sys.argv)
     window = MainWindow()
 
+    app.aboutToQuit.connect(window.data.close) # Writes out anything still pending before the process ends
+
     sys.exit(app.exec())
\ No newline at end of file
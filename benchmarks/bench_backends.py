@@ -0,0 +1,97 @@
+"""
+benchmarks/bench_backends
+
+Author: Jake Hickey
+Description: Compares the JSON and SQLite storage backends on saves of increasing size
+"""
+
+# Imports
+import sys, os, tempfile, random, time, statistics
+
+from datetime import timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from studytime.core import *
+from studytime.savefile import build_file, encode_year
+
+SUBJECTS = ["Applied Computing", "Maths Methods", "Maths Specialist", "Chemistry", "English"]
+ACTIVITIES = ["Homework", "Revision", "Practice Exam", "Reading", "Lab Report", "Essay Draft", "Worksheet", "Quiz"]
+TOPICS = ["Calculus", "Vectors", "Organic Chemistry", "Poetry", "Databases", "Probability", "Redox", "Statistics"]
+
+def make_dates(count: int) -> dict:
+    """
+    Returns {"YYYY-MM-DD": [items]} holding count items, eight a day from 2000 onwards
+    """
+    random.seed(count)
+    start = datetime(2000, 1, 1).toordinal()
+    dates = {}
+
+    for idx in range(count):
+        day = datetime.fromordinal(start + idx // 8).replace(hour=8 + idx % 8)
+        name = f"{random.choice(ACTIVITIES)} {random.choice(TOPICS)} {random.randint(1, 20)}"
+        dates.setdefault(day.strftime("%Y-%m-%d"), []).append(Task(name, day, random.choice(SUBJECTS)).prepare_dict())
+
+    return dates
+
+def write_save(directory: str, backend: str, dates: dict):
+    """
+    Writes the dates straight into a save for the given backend, skipping SaveInstance so setup stays quick
+    """
+    if backend == "json":
+        years = {}
+        for key, items in dates.items():
+            years.setdefault(int(key[:4]), {})[key] = items
+
+        content, header = build_file(0, {year: encode_year(year_dates) for year, year_dates in years.items()})
+
+        with open(f"{directory}/bench.json", "wb") as f:
+            f.write(content)
+    else:
+        save = SaveInstance("bench", directory, backend="sqlite")
+        save.storage.insert_many({key: [Item.from_dict(item) for item in items] for key, items in dates.items()})
+        save.close()
+
+def timed(func, rounds: int) -> float:
+    """
+    Returns the median latency of func in milliseconds
+    """
+    latencies = []
+    for idx in range(rounds):
+        start = time.perf_counter()
+        func(idx)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(latencies)
+
+def main(sizes: list, rounds: int = 50):
+    print(f"{'items':>8} {'backend':<7} {'open':>9} {'year':>9} {'date':>9} {'add':>9} {'remove':>9} {'name':>9} {'file MB':>8}")
+
+    for count in sizes:
+        dates = make_dates(count)
+        last = datetime.strptime(max(dates), "%Y-%m-%d")
+        span = (last - datetime.strptime(min(dates), "%Y-%m-%d")).days + 1
+        years = sorted({int(key[:4]) for key in dates}, reverse=True)
+
+        for backend in ("json", "sqlite"):
+            with tempfile.TemporaryDirectory() as directory:
+                write_save(directory, backend, dates)
+
+                start = time.perf_counter()
+                save = SaveInstance("bench", directory, backend=backend)
+                opened = (time.perf_counter() - start) * 1000
+
+                # First lookup in each year, which has to read it from storage, then lookups once everything is in memory
+                year = timed(lambda idx: save.search_date(datetime(years[idx], 6, 1)), len(years))
+                date = timed(lambda idx: save.search_date(last - timedelta(days=idx * 40 % span)), rounds)
+                add = timed(lambda idx: save.add_task(f"Bench {idx}", last.replace(hour=20, minute=idx), "English"), rounds)
+                remove = timed(lambda idx: save.remove_item(f"Bench {idx}", last.replace(hour=20, minute=idx)), rounds)
+                name = timed(lambda idx: save.search_name(random.choice(TOPICS)), rounds)
+
+                save.close()
+                size = sum(os.path.getsize(f"{directory}/{file}") for file in os.listdir(directory)) / 1024 / 1024
+
+            print(f"{count:>8} {backend:<7} {opened:>9.2f} {year:>9.3f} {date:>9.3f} {add:>9.3f} {remove:>9.3f} {name:>9.3f} {size:>8.1f}")
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 100000, 1000000])
@@ -0,0 +1,83 @@
+"""
+benchmarks/bench_calendar
+
+Author: Jake Hickey
+Description: Compares the cost of filling one calendar page (42 day cells) from per-day searches against the month
+aggregates, on a 10-year save
+"""
+
+# Imports
+import sys, os, tempfile, random, timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from studytime.core import *
+from datetime import date, timedelta
+
+def make_save(directory: str, years: int) -> SaveInstance:
+    """
+    Builds a save with a few items on most days of the given number of years
+    """
+    save = SaveInstance("bench", directory, journal=False)
+    random.seed(years)
+
+    items = []
+    day = date(2015, 1, 1)
+    while day.year < 2015 + years:
+        for idx in range(random.randrange(4)):
+            when = datetime.combine(day, datetime.min.time()).replace(hour=8 + idx)
+            items.append((when, Task(f"Study {idx}", when, "Chemistry")))
+
+        day += timedelta(days=1)
+
+    save.bulk_add(items)
+    save.save_changes()
+    save.close()
+
+    save = SaveInstance("bench", directory)
+    save.load_all() # Loading isn't what's being measured here
+
+    return save
+
+def page_days(year: int, month: int) -> list:
+    """
+    The 42 dates a month page shows, starting from the Monday on or before the 1st
+    """
+    first = date(year, month, 1)
+    start = first - timedelta(days=first.weekday())
+
+    return [start + timedelta(days=offset) for offset in range(42)]
+
+def main(years: int = 10, pages: int = 200):
+    with tempfile.TemporaryDirectory() as directory:
+        save = make_save(directory, years)
+
+        random.seed(0)
+        months = [(2015 + random.randrange(years), random.randint(1, 12)) for idx in range(pages)]
+
+        pages_shown = [page_days(year, month) for year, month in months] # Date arithmetic isn't what's being measured
+
+        def searched(): # What the calendar would have to do without aggregates: fetch each day and count it up
+            for days in pages_shown:
+                cells = []
+                for day in days:
+                    items = save.search_date(datetime.combine(day, datetime.min.time()))
+                    cells.append({"items": len(items), "incomplete": sum(item.completed is False for item in items)})
+
+        def aggregated():
+            for days in pages_shown:
+                cells, summaries = [], {}
+                for day in days:
+                    if (day.year, day.month) not in summaries:
+                        summaries[(day.year, day.month)] = save.month_summary(day.year, day.month)
+
+                    cells.append(summaries[(day.year, day.month)].get(day.day))
+
+        for name, func in (("search_date", searched), ("month_summary", aggregated)):
+            total = min(timeit.repeat(func, number=1, repeat=3))
+            print(f"{name:<14} {total / pages * 1e6:8.1f} us per page")
+
+        save.close()
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,62 @@
+"""
+benchmarks/bench_codec
+
+Author: Jake Hickey
+Description: Compares the JSON codecs on a realistic multi-year save, against the indented stdlib output saves used to have
+"""
+
+# Imports
+import sys, os, json, time, statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench_backends import make_dates
+from studytime import codec
+from studytime.items import Item
+
+def indented_dumps(obj) -> bytes:
+    return json.dumps(obj, indent=4).encode()
+
+def timed(func, rounds: int) -> float:
+    """
+    Returns the median time func takes in milliseconds
+    """
+    latencies = []
+    for idx in range(rounds):
+        start = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(latencies)
+
+def main(count: int, rounds: int = 5):
+    dates = make_dates(count) # Eight items a day from 2000 onwards, so 100k items covers about 34 years
+
+    years = {}
+    for key, items in dates.items():
+        years.setdefault(key[:4], {})[key] = items
+
+    codec.use()
+    print(f"{count} items over {len(years)} years, codecs installed: {', '.join(codec.CODECS)}")
+    print(f"{'codec':<16} {'MB':>6} {'encode':>9} {'decode':>9} {'to items':>9}")
+
+    candidates = {"json indent=4": (indented_dumps, json.loads, codec.CODECS["json"][2])}
+    candidates.update(codec.CODECS)
+
+    for name, (dumps, loads, decode_dates) in candidates.items():
+        codec.decode_dates = decode_dates # So the typed decode goes through codec.loads_dates like the storage backend does
+
+        chunks = {year: dumps(year_dates) for year, year_dates in years.items()} # Saves are encoded a year at a time
+
+        encode = timed(lambda: [dumps(year_dates) for year_dates in years.values()], rounds)
+        decode = timed(lambda: [loads(chunk) for chunk in chunks.values()], rounds)
+        typed = timed(lambda: [codec.loads_dates(chunk, Item.from_dict) for chunk in chunks.values()], rounds)
+
+        size = sum(len(chunk) for chunk in chunks.values()) / 1024 / 1024
+
+        print(f"{name:<16} {size:>6.1f} {encode:>9.1f} {decode:>9.1f} {typed:>9.1f}")
+
+    codec.use(codec.NAME)
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
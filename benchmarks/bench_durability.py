@@ -0,0 +1,90 @@
+"""
+benchmarks/bench_durability
+
+Author: Jake Hickey
+Description: Measures what crash-safe saving costs per write, step by step, against overwriting the save file in place
+"""
+
+# Imports
+import sys, os, tempfile, time, statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench_backends import make_dates
+from studytime.core import *
+from studytime.savefile import build_file, encode_year, write_atomic, write_temp
+
+def overwrite(path: str, content: bytes):
+    """
+    The old way: truncate the real file and stream into it
+    """
+    with open(path, "wb") as f:
+        f.write(content)
+
+def rename_only(path: str, content: bytes):
+    """
+    Temporary file and rename, but nothing forced to disk
+    """
+    with open(f"{path}.tmp", "wb") as f:
+        f.write(content)
+
+    os.replace(f"{path}.tmp", path)
+
+def fsync_rename(path: str, content: bytes):
+    """
+    Temporary file, fsync and rename, without keeping generations
+    """
+    write_temp(f"{path}.tmp", content)
+    os.replace(f"{path}.tmp", path)
+
+STRATEGIES = {
+    "overwrite": overwrite,
+    "rename": rename_only,
+    "fsync+rename": fsync_rename,
+    "durable": write_atomic # fsync, rename, directory fsync and three generations
+}
+
+def timed(func, rounds: int) -> float:
+    """
+    Returns the median latency of func in milliseconds
+    """
+    latencies = []
+    for idx in range(rounds):
+        start = time.perf_counter()
+        func(idx)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(latencies)
+
+def main(sizes: list, rounds: int = 20):
+    print(f"{'items':>8} {'file MB':>8} " + " ".join(f"{name:>13}" for name in STRATEGIES) + f" {'save_changes':>13} {'journal add':>13}")
+
+    for count in sizes:
+        dates = make_dates(count)
+
+        years = {}
+        for key, items in dates.items():
+            years.setdefault(int(key[:4]), {})[key] = items
+
+        content, header = build_file(0, {year: encode_year(year_dates) for year, year_dates in years.items()})
+
+        results = []
+        with tempfile.TemporaryDirectory() as directory:
+            path = f"{directory}/bench.json"
+
+            for write in STRATEGIES.values():
+                results.append(timed(lambda idx: write(path, content), rounds))
+
+            # Whole-file saves through SaveInstance, and the journalled path that most changes take instead
+            save = SaveInstance("bench", directory, journal=False)
+            results.append(timed(lambda idx: save.add_task(f"Bench {idx}", datetime(2000, 1, 1, 20, idx), "English"), rounds))
+            save.close()
+
+            save = SaveInstance("bench", directory)
+            results.append(timed(lambda idx: save.add_task(f"Journal {idx}", datetime(2000, 1, 1, 21, idx), "English"), rounds))
+            save.close()
+
+        print(f"{count:>8} {len(content) / 1024 / 1024:>8.1f} " + " ".join(f"{result:>13.3f}" for result in results))
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 100000])
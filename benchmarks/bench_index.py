@@ -0,0 +1,47 @@
+"""
+benchmarks/bench_index
+
+Author: Jake Hickey
+Description: Shows that date lookups cost the same on a 50-year save as on a 1-year save
+"""
+
+# Imports
+import sys, os, tempfile, random, timeit, calendar
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from studytime.core import *
+
+def make_save(directory: str, years: int) -> SaveInstance:
+    """
+    Builds a save with one item on every day of the given number of years
+    """
+    save = SaveInstance("bench", directory, journal=False)
+
+    for year in range(2000, 2000 + years):
+        for month in range(1, 13):
+            for day in range(1, calendar.monthrange(year, month)[1] + 1):
+                save.get_date(year, month, day).append(Task("Study", datetime(year, month, day, 9), "Chemistry"))
+
+    save.save_changes()
+
+    save = SaveInstance("bench", directory) # Reloaded so the index is the one built while loading
+    save.load_all() # Years load lazily, and that cost isn't what's being measured here
+
+    return save
+
+def main(sizes: list, lookups: int = 100000):
+    for years in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            save = make_save(directory, years)
+
+            random.seed(years)
+            dates = [(2000 + random.randrange(years), random.randint(1, 12), random.randint(1, 28)) for idx in range(lookups)]
+
+            total = timeit.timeit(lambda: [save.get_date(*date) for date in dates], number=1)
+            print(f"{years:>3} years  get_date  {total / lookups * 1e9:7.1f} ns per lookup")
+
+            save.close()
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1, 50])
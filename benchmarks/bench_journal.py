@@ -0,0 +1,56 @@
+"""
+benchmarks/bench_journal
+
+Author: Jake Hickey
+Description: Compares the cost of add_task with and without journal mode as the save file grows
+"""
+
+# Imports
+import sys, os, tempfile, time, statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from studytime.core import *
+
+def make_save(directory: str, years: int):
+    """
+    Writes a save file with one item a week for the given number of years, ending at the last year datetime supports
+    """
+    first = max(9999 - years + 1, 1) # datetime stops at 9999, so "10,000 years" is capped at 9,999
+    item = '[{"name":"Weekly Review","subject":"Chemistry","time":"09:00:00","completed":"False","type":"Task"}]'
+
+    body = ",".join(f'"{str(year).rjust(4, "0")}-{str(month).rjust(2, "0")}-{str(day).rjust(2, "0")}":{item}'
+                    for year in range(first, 10000) for month in range(1, 13) for day in (1, 8, 15, 22))
+
+    with open(f"{directory}/bench.json", "w") as f:
+        f.write(f'{{"version":2,"seq":0,"dates":{{{body}}}}}')
+
+def time_adds(save: SaveInstance, count: int) -> list:
+    """
+    Times count calls to add_task, returning each latency in milliseconds
+    """
+    latencies = []
+
+    for idx in range(count):
+        start = time.perf_counter()
+        save.add_task(f"Task {idx}", datetime(9999, 6, 15, idx % 24, idx % 60), "Chemistry")
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return latencies
+
+def main(sizes: list):
+    for years in sizes:
+        for journal, count in ((False, 5), (True, 200)): # Full rewrites of a big file take seconds each, so they get fewer samples
+            with tempfile.TemporaryDirectory() as directory:
+                make_save(directory, years)
+                save = SaveInstance("bench", directory, journal=journal)
+                save.storage.journal and setattr(save.storage.journal, "threshold", float("inf")) # Measure appends, not compaction
+
+                latencies = time_adds(save, count)
+                save.close()
+
+            mode = "journal" if journal else "rewrite"
+            print(f"{years:>5} years  {mode:<8}  median {statistics.median(latencies):9.3f} ms  max {max(latencies):9.3f} ms")
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10, 10000])
@@ -0,0 +1,47 @@
+"""
+benchmarks/bench_memory
+
+Author: Jake Hickey
+Description: Measures bytes per item for the old dictionary representation and the compact Item records
+"""
+
+# Imports
+import sys, os, json, tempfile, tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from studytime.core import *
+from studytime.savefile import read_chunks
+from benchmarks.bench_backends import make_dates, write_save
+
+def measure(load) -> int:
+    """
+    Returns how many bytes are still allocated by whatever load() returns
+    """
+    tracemalloc.start()
+    result = load()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    del result
+    return size
+
+def main(count: int):
+    with tempfile.TemporaryDirectory() as directory:
+        write_save(directory, "json", make_dates(count))
+
+        save = SaveInstance("bench", directory)
+        storage = save.storage
+        chunks = read_chunks(storage.file_path, storage.body, storage.offsets)
+
+        dicts = measure(lambda: [json.loads(chunk) for chunk in chunks.values()]) # What loading used to keep around
+        records = measure(lambda: [storage.read_year(year) for year in storage.offsets])
+
+        save.close()
+
+    print(f"{count} items")
+    print(f"  dicts  {dicts / count:7.1f} bytes per item")
+    print(f"  Item   {records / count:7.1f} bytes per item")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
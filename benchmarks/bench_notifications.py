@@ -0,0 +1,54 @@
+"""
+benchmarks/bench_notifications
+
+Author: Jake Hickey
+Description: Shows that scheduling, cancelling and firing reminders stays cheap with tens of thousands pending
+"""
+
+# Imports
+import sys, os, tempfile, random, time
+
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from studytime.notifications import NotificationScheduler, StubBackend
+
+def per_call(func, calls: int) -> float:
+    """
+    Returns the mean time of func over calls, in microseconds
+    """
+    start = time.perf_counter()
+    for idx in range(calls):
+        func(idx)
+
+    return (time.perf_counter() - start) / calls * 1000000
+
+def main(sizes: list, calls: int = 2000):
+    print(f"{'pending':>8} {'schedule':>10} {'cancel':>10} {'fire':>10} {'load ms':>10}")
+
+    for count in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            scheduler = NotificationScheduler(f"{directory}/bench.notifications", StubBackend())
+            now = datetime.now()
+
+            random.seed(count)
+            for idx in range(count): # Spread over the coming year, in random order
+                scheduler.schedule(f"Reminder {idx}", "Homework", "Due tomorrow", now + timedelta(minutes=random.randrange(525600)))
+
+            schedule = per_call(lambda idx: scheduler.schedule(f"Extra {idx}", "Extra", "", now + timedelta(minutes=random.randrange(525600))), calls)
+            cancel = per_call(lambda idx: scheduler.cancel(f"Reminder {idx}"), calls)
+
+            deadline = (now + timedelta(days=1)).timestamp()
+            fire = per_call(lambda idx: scheduler.fire_due(deadline), calls) # Mostly nothing due, the usual case when woken
+
+            scheduler.stop()
+
+            start = time.perf_counter()
+            NotificationScheduler(f"{directory}/bench.notifications", StubBackend()).stop()
+            load = (time.perf_counter() - start) * 1000
+
+        print(f"{count:>8} {schedule:>8.1f}us {cancel:>8.1f}us {fire:>8.1f}us {load:>10.1f}")
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000])
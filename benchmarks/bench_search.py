@@ -0,0 +1,56 @@
+"""
+benchmarks/bench_search
+
+Author: Jake Hickey
+Description: Times search_name over a save holding a large number of items
+"""
+
+# Imports
+import sys, os, tempfile, random, time, statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from studytime.core import *
+
+SUBJECTS = ["Applied Computing", "Maths Methods", "Maths Specialist", "Chemistry", "English"]
+ACTIVITIES = ["Homework", "Revision", "Practice Exam", "Reading", "Lab Report", "Essay Draft", "Worksheet", "Quiz", "Study Group"]
+TOPICS = ["Calculus", "Vectors", "Organic Chemistry", "Stoichiometry", "Poetry", "Databases", "Networking", "Probability",
+          "Equilibrium", "Shakespeare", "Algorithms", "Complex Numbers", "Redox", "Persuasive Writing", "Statistics"]
+
+QUERIES = ["calc", "Organic Chemistry", "revison", "lab", "Practice Exam Vectors 3", "chem", "shakspeare", "xyz"]
+
+def make_save(directory: str, count: int) -> SaveInstance:
+    """
+    Builds a save with count items spread across the days from 2000 onwards
+    """
+    random.seed(count)
+    save = SaveInstance("bench", directory, journal=False)
+    start = datetime(2000, 1, 1).toordinal()
+
+    for idx in range(count):
+        day = datetime.fromordinal(start + idx // 8)
+        name = f"{random.choice(ACTIVITIES)} {random.choice(TOPICS)} {random.randint(1, 20)}"
+        save.get_date(day.year, day.month, day.day).append(Task(name, day, random.choice(SUBJECTS)))
+
+    save.save_changes()
+
+    return SaveInstance("bench", directory)
+
+def main(count: int, rounds: int = 20):
+    with tempfile.TemporaryDirectory() as directory:
+        save = make_save(directory, count)
+
+        for query in QUERIES:
+            latencies = []
+            for idx in range(rounds):
+                start = time.perf_counter()
+                results = save.search_name(query)
+                latencies.append((time.perf_counter() - start) * 1000)
+
+            best = results[0]["name"] if results else "-"
+            print(f"{query!r:<26} median {statistics.median(latencies):7.3f} ms  top: {best}")
+
+        save.close()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,94 @@
+"""
+benchmarks/bench_startup
+
+Author: Jake Hickey
+Description: Measures how long a fresh interpreter takes to import studytime.core, and to show MainWindow
+"""
+
+# Imports
+import sys, os, subprocess, tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Run in a fresh interpreter from an empty directory, so the GUI's save is a throwaway one in studytime/app_data there
+SHOW_WINDOW = f"""
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, {ROOT!r})
+
+from PyQt6.QtWidgets import QApplication
+import app
+
+qapp = QApplication(sys.argv)
+window = app.MainWindow()
+qapp.processEvents()
+
+print((time.perf_counter() - start) * 1000)
+window.data.close()
+"""
+
+def import_times(module: str, runs: int) -> tuple:
+    """
+    Imports module under -X importtime in a fresh interpreter runs times. Returns the quickest total in milliseconds,
+    along with {module: self time in ms} from that run
+    """
+    best, modules = None, {}
+
+    for run in range(runs):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT,
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+        timings = {}
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "self [us]" in line:
+                continue
+
+            own, total, name = line[len("import time:"):].split("|")
+            timings[name.strip()] = (int(own) / 1000, int(total) / 1000)
+
+        if best is None or timings[module][1] < best:
+            best, modules = timings[module][1], {name: own for name, (own, total) in timings.items()}
+
+    return best, modules
+
+def window_time(runs: int) -> float:
+    """
+    Returns the quickest time, in milliseconds, from a fresh interpreter to MainWindow being shown
+    """
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen") # No display needed
+    latencies = []
+
+    for run in range(runs):
+        with tempfile.TemporaryDirectory() as directory:
+            os.makedirs(f"{directory}/studytime/app_data")
+
+            result = subprocess.run([sys.executable, "-c", SHOW_WINDOW], cwd=directory, env=env, capture_output=True, text=True)
+            if result.returncode != 0:
+                raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+            latencies.append(float(result.stdout.split()[-1]))
+
+    return min(latencies)
+
+def main(runs: int = 10, top: int = 10):
+    for module in ("studytime.core", "app"):
+        try:
+            total, modules = import_times(module, runs)
+        except RuntimeError as error:
+            print(f"import {module:<16} skipped ({error})")
+            continue
+
+        print(f"import {module:<16} {total:>8.1f} ms")
+
+        for name, own in sorted(modules.items(), key=lambda pair: pair[1], reverse=True)[:top]:
+            print(f"    {name:<40} {own:>8.2f} ms self")
+
+    try:
+        print(f"show MainWindow        {window_time(runs):>8.1f} ms")
+    except RuntimeError as error:
+        print(f"show MainWindow        skipped ({error})")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,226 @@
+"""
+benchmarks/bench_suite
+
+Author: Jake Hickey
+Description: Times SaveInstance's hot paths on generated saves of several sizes, reporting latency percentiles, peak
+memory and file size. Results are written as JSON so runs can be compared with --compare
+"""
+
+# Imports
+import sys, os, argparse, json, platform, random, shutil, subprocess, tempfile, time, tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from studytime.core import *
+from studytime import codec
+from generate_save import generate, TOPICS, ACTIVITIES
+
+SCALES = {"small": (1, 4), "medium": (5, 6), "large": (10, 8)} # Name -> (years, items a day)
+
+def percentiles(latencies: list) -> dict:
+    """
+    Summarises latencies (in seconds) as milliseconds
+    """
+    ordered = sorted(latencies)
+
+    def pick(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    return {"rounds": len(ordered), "p50_ms": pick(0.5), "p90_ms": pick(0.9), "p99_ms": pick(0.99), "max_ms": ordered[-1] * 1000}
+
+def peak_memory(func) -> float:
+    """
+    Runs func once under tracemalloc, returning the most memory it had allocated at any point, in KiB. Kept apart
+    from the timed rounds, since tracing slows everything down
+    """
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+class Suite:
+    """
+    One generated save, and a SaveInstance over a working copy of it that the operations can change freely
+    """
+    def __init__(self, directory: str, years: int, per_day: float, seed: int):
+        self.directory = directory
+        self.source = generate(f"{directory}/source", "bench", years, per_day, seed=seed)
+        self.years = range(2020, 2020 + years)
+
+        self.rng = random.Random(seed)
+        self.save = None
+        self.added = []
+
+    def reset(self) -> SaveInstance:
+        """
+        Starts again from a fresh copy of the generated save
+        """
+        if self.save is not None:
+            self.save.close()
+
+        shutil.rmtree(f"{self.directory}/work", ignore_errors=True)
+        os.makedirs(f"{self.directory}/work")
+        shutil.copyfile(self.source, f"{self.directory}/work/bench.json")
+
+        self.save = self.open()
+        return self.save
+
+    def open(self) -> SaveInstance:
+        save = SaveInstance("bench", f"{self.directory}/work")
+        save.load_all()
+
+        return save
+
+    def random_time(self) -> datetime:
+        day = datetime(self.rng.choice(self.years), 1, 1) + timedelta(days=self.rng.randrange(365))
+        return day.replace(hour=self.rng.randint(7, 21))
+
+    # Operations; each is one timed call
+
+    def load_file(self):
+        self.open().close()
+
+    def add_task(self):
+        self.save.add_task("Bench", self.random_time(), "Chemistry")
+
+    def add_task_tracked(self):
+        when = self.random_time()
+        task = Task(f"Bench {len(self.added)}", when, "Chemistry")
+
+        self.save.add_item(when, task)
+        self.added.append(task.id)
+
+    def remove_item(self):
+        self.save.remove_item(self.added.pop())
+
+    def scan_items(self):
+        self.save.scan_items()
+
+    def search_name(self):
+        query = self.rng.choice([self.rng.choice(ACTIVITIES), self.rng.choice(TOPICS), f"{self.rng.choice(TOPICS)[:4]}"])
+        self.save.search_name(query)
+
+    def search_date(self):
+        self.save.search_date(self.random_time())
+
+    def save_changes(self):
+        self.save.save_changes()
+
+    def operations(self, rounds: int) -> list:
+        """
+        Returns (name, function, rounds, setup) for each operation. Setup runs untimed before the rounds start
+        """
+        slow = max(3, rounds // 50) # Whole-file operations get fewer rounds
+
+        def fill():
+            for idx in range(rounds):
+                self.add_task_tracked()
+
+        return [
+            ("load_file", self.load_file, slow, None),
+            ("add_task", self.add_task, rounds, None),
+            ("remove_item", self.remove_item, rounds, fill),
+            ("scan_items", self.scan_items, slow, None),
+            ("search_name", self.search_name, rounds, None),
+            ("search_date", self.search_date, rounds, None),
+            ("save_changes", self.save_changes, slow, None)
+        ]
+
+    def run(self, rounds: int) -> dict:
+        results = {"file_bytes": os.path.getsize(self.source), "operations": {}}
+
+        for name, func, count, setup in self.operations(rounds):
+            self.reset()
+            if setup is not None:
+                setup()
+
+            latencies = []
+            for idx in range(count):
+                start = time.perf_counter()
+                func()
+                latencies.append(time.perf_counter() - start)
+
+            result = percentiles(latencies)
+
+            self.reset()
+            if setup is not None:
+                setup()
+
+            result["peak_kib"] = peak_memory(func)
+            results["operations"][name] = result
+
+        self.save.close()
+        self.save = None
+
+        return results
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    codec.use() # Makes sure NAME reflects the codec actually in use
+
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "codec": codec.NAME
+    }
+
+def compare(old: dict, new: dict):
+    """
+    Prints the change in median latency and peak memory for every operation both runs have
+    """
+    print(f"\n{'scale':<8} {'operation':<14} {'p50 before':>11} {'p50 after':>11} {'change':>8} {'peak KiB':>10}")
+
+    for scale, results in new["results"].items():
+        previous = old["results"].get(scale, {}).get("operations", {})
+
+        for name, result in results["operations"].items():
+            if name not in previous:
+                continue
+
+            before, after = previous[name]["p50_ms"], result["p50_ms"]
+            change = f"{(after / before - 1) * 100:+.0f}%" if before > 0 else "n/a"
+
+            print(f"{scale:<8} {name:<14} {before:>11.3f} {after:>11.3f} {change:>8} {result['peak_kib']:>10.0f}")
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Benchmark SaveInstance on generated saves")
+    parser.add_argument("--scales", default="small,medium", help=f"comma separated, from {', '.join(SCALES)}")
+    parser.add_argument("--rounds", type=int, default=200, help="timed calls for the quick operations")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="an earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    report = {"environment": environment(), "rounds": args.rounds, "seed": args.seed, "results": {}}
+
+    for scale in args.scales.split(","):
+        years, per_day = SCALES[scale]
+
+        with tempfile.TemporaryDirectory() as directory:
+            results = Suite(directory, years, per_day, args.seed).run(args.rounds)
+
+        report["results"][scale] = {"years": years, "per_day": per_day, **results}
+
+        print(f"{scale} ({years} years, {per_day} a day, {results['file_bytes']} bytes)")
+        for name, result in results["operations"].items():
+            print(f"  {name:<14} p50 {result['p50_ms']:9.3f} ms  p99 {result['p99_ms']:9.3f} ms  peak {result['peak_kib']:9.0f} KiB")
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+if __name__ == "__main__":
+    main()
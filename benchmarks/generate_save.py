@@ -0,0 +1,123 @@
+"""
+benchmarks/generate_save
+
+Author: Jake Hickey
+Description: Generates realistic save files of any size for benchmarking. The same arguments always give the same
+file, byte for byte
+"""
+
+# Imports
+import sys, os, argparse, random
+
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from studytime.savefile import build_file, encode_year
+
+SUBJECTS = {"Applied Computing": 3, "Maths Methods": 3, "Maths Specialist": 2, "Chemistry": 2, "English": 2}
+ACTIVITIES = ["Homework", "Revision", "Practice Exam", "Reading", "Lab Report", "Essay Draft", "Worksheet", "Quiz"]
+TOPICS = ["Calculus", "Vectors", "Organic Chemistry", "Poetry", "Databases", "Probability", "Redox", "Statistics"]
+EVENTS = ["Assembly", "Sport", "Parent Teacher Night", "Excursion", "Band Practice", "Work Shift"]
+TYPES = {"Task": 6, "Assignment": 1, "Event": 3} # Relative weights of each item type
+
+def parse_mix(text: str) -> dict:
+    """
+    Reads a weighted mix like "Chemistry=3,English=1" from the command line
+    """
+    mix = {}
+    for part in text.split(","):
+        name, sep, weight = part.partition("=")
+        mix[name.strip()] = float(weight) if sep else 1.0
+
+    return mix
+
+def generate_dates(years: int, per_day: float, subjects: dict = None, start_year: int = 2020, seed: int = 0) -> dict:
+    """
+    Returns {"YYYY-MM-DD": [item dictionaries]} for the given number of years, averaging per_day items a day. Weekends
+    get fewer items than school days, and items before "today" (the middle of the range) are mostly completed
+    """
+    rng = random.Random(seed)
+    subjects = subjects or SUBJECTS
+
+    subject_names, subject_weights = list(subjects), list(subjects.values())
+    type_names, type_weights = list(TYPES), list(TYPES.values())
+
+    first = date(start_year, 1, 1)
+    days = (date(start_year + years, 1, 1) - first).days
+    today = first + timedelta(days=days // 2)
+
+    dates = {}
+    for offset in range(days):
+        day = first + timedelta(days=offset)
+        mean = per_day * (0.4 if day.weekday() >= 5 else 1.24) # Averages out to per_day over a week
+
+        count = int(mean) + (rng.random() < mean - int(mean))
+        if count == 0:
+            continue
+
+        items = []
+        for idx in range(count):
+            kind = rng.choices(type_names, type_weights)[0]
+            item_time = f"{rng.randint(7, 21):02}:{rng.choice((0, 15, 30, 45)):02}:00"
+
+            item = {"id": f"{rng.getrandbits(64):016x}"}
+
+            if kind == "Event":
+                item.update({"name": rng.choice(EVENTS), "time": item_time, "type": kind})
+            else:
+                name = f"{rng.choice(ACTIVITIES)} {rng.choice(TOPICS)} {rng.randint(1, 20)}"
+                completed = day < today and rng.random() < 0.9
+
+                item.update({"name": name, "subject": rng.choices(subject_names, subject_weights)[0], "time": item_time,
+                             "completed": f"{completed}", "type": kind})
+
+            items.append(item)
+
+        items.sort(key=lambda item: item["time"]) # Same order SaveInstance keeps each day in
+        dates[day.isoformat()] = items
+
+    return dates
+
+def write_save(directory: str, name: str, dates: dict) -> str:
+    """
+    Writes dates out as a save SaveInstance(name, directory) will read, returning its path
+    """
+    years = {}
+    for key, items in dates.items():
+        years.setdefault(int(key[:4]), {})[key] = items
+
+    content, header = build_file(0, {year: encode_year(year_dates) for year, year_dates in years.items()})
+
+    os.makedirs(directory, exist_ok=True)
+    path = f"{directory}/{name}.json"
+
+    with open(path, "wb") as f:
+        f.write(content)
+
+    for stale in (f"{directory}/{name}.journal", f"{directory}/{name}.journal.old"): # From a previous run, and newer than the file
+        if os.path.exists(stale):
+            os.remove(stale)
+
+    return path
+
+def generate(directory: str, name: str = "bench", years: int = 5, per_day: float = 4, subjects: dict = None,
+             start_year: int = 2020, seed: int = 0) -> str:
+    return write_save(directory, name, generate_dates(years, per_day, subjects, start_year, seed))
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic StudyTime save")
+    parser.add_argument("directory")
+    parser.add_argument("--name", default="bench")
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--per-day", type=float, default=4, help="average items a day")
+    parser.add_argument("--subjects", type=parse_mix, help='weighted subject mix, e.g. "Chemistry=3,English=1"')
+    parser.add_argument("--start-year", type=int, default=2020)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    path = generate(args.directory, args.name, args.years, args.per_day, args.subjects, args.start_year, args.seed)
+    print(f"{path}  {os.path.getsize(path)} bytes")
+
+if __name__ == "__main__":
+    main()
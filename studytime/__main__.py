@@ -0,0 +1,13 @@
+"""
+studytime.__main__
+
+Author: Jake Hickey
+Description: Lets the command-line interface run as python -m studytime
+"""
+
+# Imports
+from studytime.cli import main
+
+import sys
+
+sys.exit(main())
@@ -0,0 +1,395 @@
+"""
+studytime.cli
+
+Author: Jake Hickey
+Description: Command-line interface over SaveInstance, for scripts and scheduled jobs. Run with python -m studytime
+"""
+
+# Imports
+from studytime.core import *
+from studytime.notifications import BACKENDS as NOTIFIERS
+from studytime import instrument
+
+import argparse, bisect, json, sys
+
+ITEM_TYPES = {"task": "Task", "event": "Event", "assignment": "Assignment"}
+EVERY = {"day": ("daily", 1), "week": ("weekly", 1), "fortnight": ("weekly", 2)} # --every -> (frequency, interval)
+
+def parse_when(text: str) -> datetime:
+    """
+    Reads "YYYY-MM-DD HH:MM" (or anything else datetime.fromisoformat accepts) from the command line
+    """
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a date and time like 2024-03-05 09:00, not {text!r}")
+
+def parse_day(text: str) -> datetime:
+    try:
+        return datetime.strptime(text, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a date like 2024-03-05, not {text!r}")
+
+def item_line(key: tuple, item) -> dict:
+    """
+    The JSON-lines form of an item: its save file dictionary with an ISO "date" in front
+    """
+    return {"date": f"{key[0]:04}-{key[1]:02}-{key[2]:02}", **item.prepare_dict()}
+
+def write_lines(rows, output):
+    count = 0
+    for row in rows:
+        output.write(json.dumps(row) + "\n")
+        count += 1
+
+    return count
+
+def all_items(save: SaveInstance, start: datetime = None, end: datetime = None, occurrences: bool = True):
+    """
+    Yields (date key, item) for every item between start and end inclusive, or in the whole save, including the
+    occurrences of recurring items unless told otherwise. Without an end, rules that never stop are followed until a
+    year past today, start or the last saved date, whichever is latest
+    """
+    if not (occurrences and save.rules):
+        if start is None and end is None:
+            save.load_all()
+            keys = list(save.dates)
+        else:
+            start, end = start or datetime(1, 1, 1), end or datetime(9999, 12, 31)
+            save.search_range(start, end)
+
+            first = bisect.bisect_left(save.dates, (start.year, start.month, start.day))
+            keys = save.dates[first:bisect.bisect_right(save.dates, (end.year, end.month, end.day))]
+
+        for key in keys:
+            for item in list(save.index[key]):
+                yield key, item
+
+        return
+
+    if start is None:
+        start = datetime(1, 1, 1)
+
+    if end is None:
+        save.load_all()
+        last = max(datetime.now().date(), start.date())
+        if save.dates:
+            last = max(last, date(*save.dates[-1]))
+
+        last += timedelta(days=min(365, (date.max - last).days))
+
+        for rule in save.rules.values():
+            if rule.until is not None:
+                last = max(last, rule.until)
+
+        end = datetime.combine(last, datetime.min.time())
+
+    for entry in save.search_range(start, end): # search_range gives the calendar's mm/dd/YYYY dates
+        month, day, year = entry["date"].split("/")
+        for item in list(entry["data"]):
+            yield (int(year), int(month), int(day)), item
+
+def record_item(line: dict):
+    """
+    Turns an imported or batched line into (item_time, item). Lines use the export format, with "time" as
+    "HH:MM" or "HH:MM:SS" and "type" in either case
+    """
+    line = dict(line)
+    line["type"] = ITEM_TYPES.get(f"{line.get('type', 'task')}".lower())
+
+    if line["type"] is None:
+        raise ValueError(f"unknown item type in {line}")
+
+    line["time"] = parse_time(line["time"]).strftime("%H:%M:%S")
+
+    if line["type"] != "Event" and "completed" not in line:
+        line["completed"] = "False"
+
+    item = Item.from_dict(line)
+
+    return datetime.combine(parse_day(line["date"]).date(), item.time), item
+
+def claim_id(save: SaveInstance, item, claimed: set = None):
+    """
+    Gives an imported item a new ID if its own is already in use, e.g. by the save it was exported from or an earlier
+    line (in claimed) of the same file
+    """
+    if item.id is None: # Lines without one get a legacy_id when they're added
+        return
+
+    if item.id in (claimed or ()) or save.get_item(item.id) is not None:
+        item.id = new_id()
+
+    if claimed is not None:
+        claimed.add(item.id)
+
+def apply_line(save: SaveInstance, line: dict) -> bool:
+    """
+    Applies one batch operation, returning False if a remove found nothing to remove
+    """
+    op = line.get("op", "add")
+
+    if op == "add":
+        item_time, item = record_item(line)
+        claim_id(save, item)
+
+        save.add_item(item_time, item)
+        return True
+
+    if op == "remove": # By "id", or by "name", "date" and "time" for lines written by hand
+        if "id" in line:
+            item = save.get_item(line["id"])
+        else:
+            item = save.find_item(line["name"], datetime.combine(parse_day(line["date"]).date(), parse_time(line["time"])))
+
+        if item is None:
+            return False
+
+        save.remove_item(item.id) # Notifications for it are cancelled too
+        return True
+
+    raise ValueError(f"unknown op {op!r}")
+
+def read_lines(source):
+    for number, text in enumerate(source, 1):
+        if text.strip() == "":
+            continue
+
+        try:
+            yield json.loads(text)
+        except json.JSONDecodeError as error:
+            raise ValueError(f"line {number}: {error}")
+
+def command_add(save: SaveInstance, args) -> int:
+    item_type = ITEM_TYPES[args.type]
+    if item_type != "Event" and args.subject is None:
+        raise ValueError(f"{args.type}s need a --subject")
+
+    if item_type == "Task":
+        save.add_task(args.name, args.when, args.subject)
+    elif item_type == "Event":
+        save.add_event(args.name, args.when)
+    else:
+        save.add_assignment(args.name, args.when, args.subject)
+
+    return 0
+
+def command_recur(save: SaveInstance, args) -> int:
+    item_type = ITEM_TYPES[args.type]
+    if item_type != "Event" and args.subject is None:
+        raise ValueError(f"{args.type}s need a --subject")
+
+    item = Item.from_dict({"name": args.name, "type": item_type, "time": args.when.strftime("%H:%M:%S"), "subject": args.subject})
+    frequency, interval = EVERY[args.every]
+
+    rule_id = save.add_recurring(args.when, item, frequency=frequency, interval=interval,
+                                 until=args.until.date() if args.until is not None else None)
+
+    print(json.dumps({"rule": rule_id}))
+    return 0
+
+def command_remove(save: SaveInstance, args) -> int:
+    if not apply_line(save, {"op": "remove", "name": args.name, "date": args.when.strftime("%Y-%m-%d"),
+                             "time": args.when.strftime("%H:%M:%S")}):
+        raise ValueError(f"no item called {args.name!r} at {args.when}")
+
+    return 0
+
+def command_list(save: SaveInstance, args) -> int:
+    write_lines((item_line(key, item) for key, item in all_items(save, args.start, args.end)), sys.stdout)
+    return 0
+
+def command_search(save: SaveInstance, args) -> int:
+    rows = []
+    for result in save.search_name(args.query, args.limit): # search_name gives the calendar's mm/dd/YYYY dates
+        month, day, year = result.pop("date").split("/")
+        rows.append({"date": f"{year}-{month}-{day}", **result})
+
+    write_lines(rows, sys.stdout)
+    return 0
+
+def command_import(save: SaveInstance, args) -> int:
+    source = sys.stdin if args.file == "-" else open(args.file, "r")
+
+    with source:
+        lines = list(read_lines(source))
+
+    rules = [Rule.from_dict(line["rule"]) for line in lines if "rule" in line] # Recurring items, as export writes them
+    items = [record_item(line) for line in lines if "rule" not in line]
+
+    claimed = set()
+    for item_time, item in items:
+        claim_id(save, item, claimed)
+
+    with save.batch(): # One save for the whole file
+        for rule in rules:
+            if rule.id in save.rules:
+                rule.id = new_id()
+
+            save.add_rule(rule)
+
+        save.bulk_add(items)
+
+    print(json.dumps({"imported": len(items), "rules": len(rules)}))
+    return 0
+
+def command_export(save: SaveInstance, args) -> int:
+    output = sys.stdout if args.file == "-" else open(args.file, "w")
+
+    with output:
+        count = write_lines((item_line(key, item) for key, item in all_items(save, occurrences=False)), output)
+        write_lines(({"rule": rule.prepare_dict()} for rule in save.rules.values()), output) # Rather than their occurrences
+
+    if args.file != "-":
+        print(json.dumps({"exported": count, "rules": len(save.rules)}))
+
+    return 0
+
+def command_stats(save: SaveInstance, args) -> int:
+    types, subjects, completed, total, dates = {}, {}, 0, 0, []
+    for key, item in all_items(save): # Occurrences of recurring items count too, over the same dates list gives
+        total += 1
+        types[item.type.value] = types.get(item.type.value, 0) + 1
+
+        if item.subject is not None:
+            subjects[item.subject] = subjects.get(item.subject, 0) + 1
+
+        completed += item.completed is True
+
+        if not dates or dates[-1] != key:
+            dates.append(key)
+
+    stats = {
+        "items": total,
+        "dates": len(dates),
+        "years": len({key[0] for key in dates}),
+        "first": "-".join(f"{part:02}" for part in dates[0]) if dates else None,
+        "last": "-".join(f"{part:02}" for part in dates[-1]) if dates else None,
+        "completed": completed,
+        "types": types,
+        "subjects": subjects,
+        "rules": len(save.rules)
+    }
+
+    print(json.dumps(stats))
+    return 0
+
+def command_batch(save: SaveInstance, args) -> int:
+    """
+    Applies every operation read from stdin in a single batch, so the save is loaded and written once
+    """
+    results = {"added": 0, "removed": 0, "missing": 0}
+
+    with save.batch():
+        for line in read_lines(sys.stdin):
+            if not apply_line(save, line):
+                results["missing"] += 1
+            elif line.get("op", "add") == "add":
+                results["added"] += 1
+            else:
+                results["removed"] += 1
+
+    print(json.dumps(results))
+    return 0
+
+def command_notify(save: SaveInstance, args) -> int:
+    """
+    Runs the reminder scheduler in the foreground until interrupted, or with --once just shows anything already due
+    """
+    scheduler = save.get_notifications()
+    if args.notifier is not None:
+        scheduler.backend = NOTIFIERS[args.notifier]()
+
+    if args.once:
+        print(json.dumps({"shown": scheduler.fire_due(), "pending": len(scheduler.reminders)}))
+        return 0
+
+    scheduler.running = True
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m studytime", description="Work with StudyTime saves without the GUI")
+    parser.add_argument("--save", default="dates", help="save name (default: dates)")
+    parser.add_argument("--dir", default="studytime/app_data", help="directory holding the save (default: studytime/app_data)")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="json")
+    parser.add_argument("--profile", metavar="MODES", help="time hot paths and print the stats to stderr on exit; "
+                        "MODES is timing, cprofile and/or tracemalloc, comma separated")
+
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="add an item")
+    add.add_argument("type", choices=sorted(ITEM_TYPES))
+    add.add_argument("name")
+    add.add_argument("when", type=parse_when, help='e.g. "2024-03-05 09:00"')
+    add.add_argument("--subject")
+    add.set_defaults(func=command_add)
+
+    recur = commands.add_parser("recur", help="add an item that repeats, e.g. a weekly class")
+    recur.add_argument("type", choices=sorted(ITEM_TYPES))
+    recur.add_argument("name")
+    recur.add_argument("when", type=parse_when, help="date and time of the first occurrence")
+    recur.add_argument("--every", choices=sorted(EVERY), default="week")
+    recur.add_argument("--until", type=parse_day, help="last date it can fall on, e.g. the end of term")
+    recur.add_argument("--subject")
+    recur.set_defaults(func=command_recur)
+
+    remove = commands.add_parser("remove", help="remove an item by name and time")
+    remove.add_argument("name")
+    remove.add_argument("when", type=parse_when)
+    remove.set_defaults(func=command_remove)
+
+    listing = commands.add_parser("list", help="print items as JSON lines, optionally between two dates")
+    listing.add_argument("--start", type=parse_day)
+    listing.add_argument("--end", type=parse_day, help="default: the last item, though repeating items are listed "
+                         "until a year past today or the last item, whichever is later")
+    listing.set_defaults(func=command_list)
+
+    search = commands.add_parser("search", help="print the closest name matches as JSON lines")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=10)
+    search.set_defaults(func=command_search)
+
+    importing = commands.add_parser("import", help="add every item from a JSON-lines file (- for stdin) in one save")
+    importing.add_argument("file")
+    importing.set_defaults(func=command_import)
+
+    export = commands.add_parser("export", help="write every item and repeating item rule as JSON lines (default: stdout)")
+    export.add_argument("file", nargs="?", default="-")
+    export.set_defaults(func=command_export)
+
+    stats = commands.add_parser("stats", help="print totals for the save as JSON, repeating items included")
+    stats.set_defaults(func=command_stats)
+
+    batch = commands.add_parser("batch", help='apply {"op": "add" | "remove", ...} lines from stdin in one save')
+    batch.set_defaults(func=command_batch)
+
+    notify = commands.add_parser("notify", help="show reminders as they come due, for when the GUI isn't open")
+    notify.add_argument("--notifier", choices=sorted(NOTIFIERS), help="how to show them (default: picked for this platform)")
+    notify.add_argument("--once", action="store_true", help="show anything already due and exit, e.g. from cron")
+    notify.set_defaults(func=command_notify)
+
+    return parser
+
+def main(argv: list = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if args.profile is not None:
+        instrument.enable(args.profile)
+
+    save = SaveInstance(args.save, args.dir, backend=args.backend)
+
+    try:
+        return args.func(save, args)
+    except KeyError as error: # A batch or import line without a field it needs
+        print(f"error: missing field {error}", file=sys.stderr)
+        return 1
+    except (ValueError, OSError) as error: # Bad input lines, unreadable files
+        print(f"error: {error}", file=sys.stderr)
+        return 1
+    finally:
+        save.close()
@@ -0,0 +1,97 @@
+"""
+studytime.codec
+
+Author: Jake Hickey
+Description: JSON encoding and decoding for save files and journals, using orjson or msgspec when they're installed
+"""
+
+# Imports
+import gc, json
+
+def stdlib_dumps(obj) -> bytes:
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+def stdlib_dates(data: bytes, build) -> dict:
+    # Hook runs on each object as it's parsed, so item dictionaries never outlive the item built from them
+    return json.loads(data, object_hook=lambda obj: build(obj) if "type" in obj else obj)
+
+CODECS = {"json": (stdlib_dumps, json.loads, stdlib_dates)} # Name -> (dumps, loads, loads_dates), fastest installed last
+DecodeError = (ValueError,) # Every error a codec raises for malformed input
+
+NAME = None # Picked on first use, so the accelerated codecs (and everything they import) cost nothing at startup
+LOADED = False
+
+def load_codecs() -> dict:
+    """
+    Imports whichever accelerated codecs are installed, adding them to CODECS
+    """
+    global DecodeError, LOADED
+
+    if LOADED:
+        return CODECS
+
+    LOADED = True
+
+    try:
+        import msgspec
+    except ImportError:
+        pass
+    else:
+        def msgspec_dates(data: bytes, build) -> dict:
+            return {key: [build(item) for item in items] for key, items in msgspec.json.decode(data).items()}
+
+        CODECS["msgspec"] = (msgspec.json.encode, msgspec.json.decode, msgspec_dates)
+        DecodeError += (msgspec.DecodeError,)
+
+    try:
+        import orjson
+    except ImportError:
+        pass
+    else:
+        def orjson_dumps(obj) -> bytes:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS) # The header's year table is keyed by int
+
+        def orjson_dates(data: bytes, build) -> dict:
+            return {key: [build(item) for item in items] for key, items in orjson.loads(data).items()}
+
+        CODECS["orjson"] = (orjson_dumps, orjson.loads, orjson_dates)
+
+    return CODECS
+
+# Until a codec is picked, these stand in for it. use() rebinds them, and callers always go through the module
+# (codec.dumps), so every call after the first goes straight to the real one
+def dumps(obj) -> bytes:
+    use()
+    return dumps(obj)
+
+def loads(data):
+    use()
+    return loads(data)
+
+def decode_dates(data: bytes, build) -> dict:
+    use()
+    return decode_dates(data, build)
+
+def loads_dates(data: bytes, build) -> dict:
+    """
+    Decodes a {"YYYY-MM-DD": [items]} object, passing each item dictionary through build. Items can't form reference
+    cycles, so the cycle collector is paused rather than left to rescan the thousands of objects being created
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+
+    try:
+        return decode_dates(data, build)
+    finally:
+        if enabled:
+            gc.enable()
+
+def use(name: str = None):
+    """
+    Switches every save file and journal over to the named codec (the fastest installed one by default), e.g. "json"
+    to rule out an accelerated one
+    """
+    global NAME, dumps, loads, decode_dates
+
+    NAME = name or list(load_codecs())[-1]
+    dumps, loads, decode_dates = CODECS[NAME]
@@ -8,52 +8,518 @@ Description: A library containing backend logic for StudyTime processes
 # Imports
 if __name__ == "__main__": # Band-Aid fix for if I want to directly test this module in particular (deleting later)
     from time_class import *
+    from items import *
+    from search import SearchIndex
+    from storage import *
+    from writer import BackgroundWriter
+    from notifications import NotificationScheduler, schedule_record
+    from recurrence import *
+    import instrument
 else:
     from studytime.time_class import *
+    from studytime.items import *
+    from studytime.search import SearchIndex
+    from studytime.storage import *
+    from studytime.writer import BackgroundWriter
+    from studytime.notifications import NotificationScheduler, schedule_record
+    from studytime.recurrence import *
+    from studytime import instrument
 
-from datetime import datetime
-from pathlib import Path
+from contextlib import contextmanager
+from datetime import date, datetime
 
-import calendar, json, re, difflib, win32com, win32com.client, os
+import bisect, os, threading
+
+READ_ATTEMPTS = 5 # Times load_year re-reads the save if another process keeps swapping the file out underneath it
 
 class SaveInstance:
     """
     Data handler for StudyTime saves
     """
-    def __init__(self, file_name: str):
+    def __init__(self, file_name: str, directory: str = "studytime/app_data", journal: bool = True, backend: str = "json",
+                 write_behind: float = None):
         """
-        Caches relevant data from json file
+        Caches relevant data from the save. The backend is either "json" (a save file, where journal mode appends
+        changes to a journal instead of rewriting the whole file each time) or "sqlite" (a database of item rows).
+        With write_behind set, changes are persisted by a background thread within that many seconds instead of
+        before each change method returns
         """
         self.file_name = file_name
-        self.data = self.load_file()
 
-        self.items = self.scan_items()
+        self.lock = threading.RLock() # Guards self.data while a background compaction is serialising it
+        self.listeners = [] # Callbacks run with each change record once it has been applied
+        self.batching = None # Records held back by an open batch()
+        self.deferred = [] # Actions held back by an open batch() until its records are stored, see when_stored
+
+        self.seq = 0 # Sequence number of the last change applied to self.data
+        self.caught_up = False # Whether changes from another process have been taken in since refresh last looked
+
+        if backend == "json":
+            self.storage = JsonStorage(self, directory, file_name, journal)
+        else:
+            self.storage = BACKENDS[backend](self, directory, file_name)
+
+        self.writer = BackgroundWriter(self, write_behind) if write_behind is not None else None
+        self.notifications = None # Reminder scheduler, only created once something uses notifications
+
+        self.data = self.load_file()
 
     def add_item(self, item_time: datetime, item: object):
         """
         A generic method for adding organizational items to the relevant date
         """
-        year, month, day = item_time.year, item_time.month, item_time.day
-        data = self.get_date(year, month, str(day).rjust(2, "0"))
-
-        data.append(item.prepare_dict())
-        data.sort(key=lambda x : x["time"]) # Sorts the date items by their timestamp in ascending order
+        record = {
+            "op": "add",
+            "date": item_time.strftime("%Y-%m-%d"),
+            "item": item.prepare_dict()
+        }
 
-        self.save_changes()
+        self.commit(record)
     
-    def remove_item(self, item_name: str, item_time: datetime):
+    def remove_item(self, item: str, item_time: datetime = None):
+        """
+        Removes an item by its ID. For older callers, an item name and time also works, removing the first match
+        """
+        if item_time is not None:
+            found = self.find_item(item, item_time)
+            if found is None:
+                return
+
+            item = found.id
+
+        location = self.locate(item)
+        if location is None:
+            return
+
+        key, found = location
+        if item not in self.ids: # An occurrence of a recurring item, which is just skipped from now on
+            self.skip_occurrence(split_occurrence(item)[0], datetime(*key).date())
+            self.when_stored(lambda: self.cancel_notifications([item]))
+            return
+
+        record = {
+            "op": "remove",
+            "date": key_text(key),
+            "id": item,
+            "name": found.name, # Lets backends without IDs for older items (like SQLite rows) still find it
+            "time": found.time.strftime("%H:%M:%S")
+        }
+
+        self.commit(record)
+        self.when_stored(lambda: self.cancel_notifications([item]))
+
+    def edit_item(self, item_id: str, changes: dict) -> bool:
+        """
+        Changes an item in place, keeping its ID. Changes can hold "name", "subject", "type" (an ItemType),
+        "completed", "time" (a time) and "date" (a date or datetime, which moves it to that day; a datetime also
+        sets the time). Any notifications move with it. Returns False if there's no such item
+        """
+        location = self.locate(item_id)
+        if location is None:
+            return False
+
+        if item_id not in self.ids: # Occurrences become saved items of their own, keeping the same ID, before being edited
+            key, item = location
+
+            with self.batch():
+                self.skip_occurrence(split_occurrence(item_id)[0], datetime(*key).date())
+                self.add_item(datetime(*key), Item.from_dict(item.prepare_dict()))
+
+                return self.edit_item(item_id, changes)
+
+        key, item = location
+        data = item.prepare_dict()
+        moved_to = key_text(key)
+
+        for field, value in changes.items():
+            if field == "date":
+                moved_to = value.strftime("%Y-%m-%d")
+                if isinstance(value, datetime):
+                    data["time"] = value.strftime("%H:%M:%S")
+            elif field == "time":
+                data["time"] = value.strftime("%H:%M:%S")
+            elif field == "type":
+                data["type"] = value.value
+            elif value is None:
+                data.pop(field, None)
+            else:
+                data[field] = f"{value}"
+
+        if data["type"] == "Event": # Events have neither a subject nor a completed state
+            data.pop("subject", None)
+            data.pop("completed", None)
+        elif "completed" not in data:
+            data["completed"] = "False"
+
+        before = datetime.combine(datetime(*key).date(), item.time)
+
+        record = {
+            "op": "edit",
+            "date": key_text(key),
+            "id": item_id,
+            "name": item.name,
+            "time": item.time.strftime("%H:%M:%S"),
+            "to": moved_to,
+            "item": data
+        }
+
+        self.commit(record)
+
+        after = datetime.combine(datetime.strptime(moved_to, "%Y-%m-%d").date(), item.time)
+        if after != before:
+            self.when_stored(lambda: self.reschedule_notifications([(item_id, after - before)]))
+
+        return True
+
+    def set_completed(self, item_id: str, complete: bool) -> bool:
+        """
+        Marks an item as completed (or not). Returns False if there's no such item
+        """
+        return self.edit_item(item_id, {"completed": complete})
+
+    def get_item(self, item_id: str):
+        """
+        Returns the item with this ID, or None
+        """
+        location = self.locate(item_id)
+
+        return location[1] if location is not None else None
+
+    def find_item(self, item_name: str, item_time: datetime):
+        """
+        Returns the first item with this name at this time, or None
+        """
+        item_clock = item_time.time().replace(microsecond=0)
+
+        for item in self.search_date(item_time):
+            if item.name == item_name and item.time == item_clock:
+                return item
+
+        return None
+
+    def locate(self, item_id: str):
+        """
+        Returns (date key, item) for an ID, or None if it isn't in any loaded year. Years are loaded as needed, but
+        an ID that's in none of them means every year gets checked
+        """
+        with self.lock:
+            if item_id in self.ids:
+                return self.ids[item_id]
+
+            occurrence = split_occurrence(item_id)
+            if occurrence is not None and occurrence[0] in self.rules:
+                day = occurrence[1]
+                if day.year not in self.loaded: # Edited occurrences are saved under the day they were on
+                    self.load_year(day.year)
+
+                    if item_id in self.ids:
+                        return self.ids[item_id]
+
+                for item in self.expand_month(day.year, day.month).get(day.day, []):
+                    if item.id == item_id:
+                        return (day.year, day.month, day.day), item
+
+            for year in sorted(self.storage.years() | set(self.pending)):
+                if year not in self.loaded:
+                    self.load_year(year)
+
+                    if item_id in self.ids:
+                        return self.ids[item_id]
+
+        return None
+
+    def apply_record(self, record: dict) -> bool:
+        """
+        Applies a single change record to the in-memory data. Returns False if the change had nothing to act on
+        """
+        if record["op"] == "rule":
+            self.set_rule(Rule.from_dict(record["rule"]))
+            return True
+
+        if record["op"] == "unrule":
+            return self.drop_rule(record["id"])
+
+        key = date_key(record["date"])
+        data = self.get_date(*key)
+
+        if record["op"] == "add":
+            item = Item.from_dict(record["item"]) # Records carry the save file form; memory holds the compact one
+            if item.id is None: # Journalled before items had IDs
+                item.id = legacy_id(record["date"], item, record.get("seq", 0))
+
+            self.place(key, data, item)
+            return True
+
+        item = self.ids.get(record.get("id"), (None, None))[1] # Straight to the item, for records with IDs
+
+        if item is None or self.ids[item.id][0] != key:
+            item_time = parse_time(record["time"])
+            item = next((entry for entry in data if entry.name == record["name"] and entry.time == item_time), None)
+
+        if item is None:
+            return False
+
+        self.unplace(key, data, item)
+
+        if record["op"] == "edit":
+            item.update(record["item"])
+
+            new_key = date_key(record["to"])
+            self.place(new_key, self.get_date(*new_key), item)
+
+        return True
+
+    def place(self, key: tuple, data: list, item):
+        """
+        Files an item under a date, keeping every index up to date
         """
-        A generic method for removing organizational items to the relevant date
+        bisect.insort(data, item, key=lambda x : x.time) # Keeps the date items in ascending order of timestamp
+        self.search.add(item, key)
+        self.ids[item.id] = (key, item)
+        self.tally(key, item, 1)
+
+        if key not in self.catalogue: # Date has just gained its first item
+            self.catalogue[key] = {"date": f"{str(key[1]).rjust(2, '0')}/{str(key[2]).rjust(2, '0')}/{key[0]}", "data": data}
+            bisect.insort(self.dates, key)
+
+    def unplace(self, key: tuple, data: list, item):
+        """
+        Takes an item out from under a date, and out of every index
+        """
+        data.remove(item)
+        self.search.remove(item)
+        self.ids.pop(item.id, None)
+        self.tally(key, item, -1)
+
+        if data == []: # Date no longer holds anything, so it drops out of the catalogue
+            del self.catalogue[key]
+            del self.dates[bisect.bisect_left(self.dates, key)]
+
+    def set_rule(self, rule: Rule):
+        """
+        Adds or replaces a recurrence rule in memory, dropping any month expansions it could change
+        """
+        self.drop_rule(rule.id)
+
+        self.rules[rule.id] = rule
+        self.search.add(rule.template, (rule.start.year, rule.start.month, rule.start.day)) # Found under its first date
+        self.forget_months(rule)
+
+    def drop_rule(self, rule_id: str) -> bool:
+        rule = self.rules.pop(rule_id, None)
+        if rule is None:
+            return False
+
+        self.search.remove(rule.template)
+        self.forget_months(rule)
+
+        return True
+
+    def forget_months(self, rule: Rule):
+        for month in [month for month in self.expanded if rule.covers(*month)]:
+            del self.expanded[month]
+
+    def expand_month(self, year: int, month: int) -> dict:
+        """
+        Returns {day: [occurrence items]} for every recurring item in the month, working it out the first time the
+        month is asked for. Occurrences aren't saved, so editing one turns it into a saved item (see edit_item)
+        """
+        try:
+            return self.expanded[(year, month)]
+        except KeyError:
+            pass
+
+        first, last = date(year, month, 1), last_day(year, month)
+
+        days = {}
+        for rule in self.rules.values():
+            for day in rule.occurrences(first, last):
+                days.setdefault(day.day, []).append(rule.make_item(day))
+
+        for items in days.values():
+            items.sort(key=lambda x : x.time)
+
+        self.expanded[(year, month)] = days
+        return days
+
+    def add_rule(self, rule: Rule) -> str:
+        """
+        Saves a recurrence rule, returning its ID
+        """
+        self.commit({"op": "rule", "rule": rule.prepare_dict()})
+
+        return rule.id
+
+    def add_recurring(self, item_time: datetime, item: object, **options) -> str:
+        """
+        Repeats an item from item_time onwards, e.g. add_recurring(time, task, interval=2, until=end_of_term) for
+        a fortnightly assignment. Options are those of Rule. Returns the rule's ID
         """
+        return self.add_rule(Rule.from_item(item, item_time, **options))
+
+    def remove_rule(self, rule_id: str):
+        """
+        Removes a recurrence rule along with every occurrence that hasn't been edited into a saved item
+        """
+        if rule_id not in self.rules:
+            return
+
+        self.commit({"op": "unrule", "id": rule_id, "name": self.rules[rule_id].template.name})
+        self.when_stored(lambda: self.cancel_occurrence_notifications(rule_id))
+
+    def cancel_occurrence_notifications(self, rule_id: str):
+        """
+        Removes the notifications of every occurrence of a recurring item. Occurrences that were edited into saved
+        items keep their ID, and their notifications, after the rule is gone
+        """
+        if self.has_notifications():
+            self.get_notifications().refresh()
+
+            with self.notifications.condition:
+                items = {reminder["item"]: reminder.get("item_date") for reminder in self.notifications.reminders.values()
+                         if reminder["item"] is not None and reminder["item"].startswith(f"{rule_id}@")}
+
+            for item_date in set(items.values()) - {None}: # Where an edited occurrence would have been saved
+                self.load_year(int(item_date[:4]))
+
+            self.cancel_notifications([item_id for item_id in items if item_id not in self.ids])
+
+    def skip_occurrence(self, rule_id: str, day: date):
+        """
+        Stops a recurring item from happening on one date, e.g. a class on a public holiday
+        """
+        rule = Rule.from_dict(self.rules[rule_id].prepare_dict()) # Replaced whole, so the change is a single record
+        rule.exceptions.add(day.isoformat())
+
+        self.add_rule(rule)
+
+    def tally(self, key: tuple, item, change: int):
+        """
+        Adds an item to (or with change=-1, takes it away from) its day's totals in the month aggregates
+        """
+        days = self.months.setdefault((key[0], key[1]), {})
+        counts = days.get(key[2])
+
+        if counts is None:
+            counts = days[key[2]] = {"items": 0, "incomplete": 0, "Task": 0, "Event": 0, "Assignment": 0}
+
+        counts["items"] += change
+        counts[item.type.value] += change
+        counts["incomplete"] += change if item.completed is False else 0 # Events are never incomplete
+
+        if counts["items"] == 0:
+            del days[key[2]]
+
+    def month_summary(self, year: int, month: int) -> dict:
+        """
+        Returns {day: {"items", "incomplete", "Task", "Event", "Assignment"}} for every day of the month that holds
+        items. Without recurring items the dictionary is kept up to date as items change, so callers like the calendar
+        can hold on to it; with them it's a copy including their occurrences, and has to be asked for again
+        """
+        if year not in self.loaded:
+            self.load_year(year)
+
+        days = self.months.setdefault((year, month), {})
+
+        occurrences = self.expand_month(year, month) if self.rules else {}
+        if occurrences == {}:
+            return days
+
+        days = {day: dict(counts) for day, counts in days.items()}
+
+        for day, items in occurrences.items():
+            counts = days.setdefault(day, {"items": 0, "incomplete": 0, "Task": 0, "Event": 0, "Assignment": 0})
+
+            for item in items:
+                counts["items"] += 1
+                counts[item.type.value] += 1
+                counts["incomplete"] += item.completed is False
+
+        return days
+
+    def commit(self, record: dict):
+        """
+        Applies a change, then hands it to the storage backend to persist
+        """
+        with self.lock:
+            if not self.apply_record(record):
+                return
+
+            self.seq += 1
+            record["seq"] = self.seq
+
+            if self.batching is not None: # Persisted and announced together when the batch finishes
+                self.batching.append(record)
+                return
+
+            if self.writer is not None:
+                self.writer.submit([record])
+            else:
+                self.storage.persist(record)
+
+        for listener in self.listeners:
+            listener(record)
+
+    @contextmanager
+    def batch(self):
+        """
+        Groups every change made inside the with block so they are persisted exactly once at the end, all or nothing.
+        If anything goes wrong, none of the changes are kept in memory either
+        """
+        with self.lock:
+            if self.batching is not None: # Nested batches just join the outer one
+                yield self
+                return
 
-        year, month, day = item_time.year, item_time.month, item_time.day
-        data = self.get_date(year, month, str(day).rjust(2, '0'))
+            self.batching, self.deferred = [], []
 
-        for item in data:
-            if item["name"] == item_name and item["time"] == str(item_time.time()): # Should be specific enough to prevent double-ups
-                data.remove(item)
-                self.save_changes()
+            try:
+                yield self
+
+                records = self.batching
+                if records != [] and self.writer is not None:
+                    self.writer.submit(records)
+                elif records != []:
+                    self.storage.persist_batch(records)
+            except BaseException:
+                self.batching, self.deferred = None, [] # e.g. reminders of removed items stay, since the items come back
+                self.load_file() # Nothing in the batch reached storage, so re-reading it puts memory back as it was
+                raise
+
+            self.batching, actions, self.deferred = None, self.deferred, []
+
+        for action in actions:
+            action()
+
+        for record in records:
+            for listener in self.listeners:
+                listener(record)
+
+    def when_stored(self, action):
+        """
+        Runs action (e.g. cancelling a removed item's reminders) once the change just made has been stored. Inside a
+        batch that's once the batch has been, and never if it's rolled back
+        """
+        with self.lock:
+            if self.batching is not None:
+                self.deferred.append(action)
                 return
+
+        action()
+
+    def bulk_add(self, items: list):
+        """
+        Adds many (item_time, item) pairs, e.g. a whole timetable, with a single save at the end
+        """
+        with self.batch():
+            for item_time, item in items:
+                self.add_item(item_time, item)
+
+    def add_listener(self, listener):
+        """
+        Registers a callback to be run with every change record, e.g. so the GUI can update itself incrementally
+        """
+        self.listeners.append(listener)
     
     def add_task(self, task_name: str, task_time: datetime, subject: str):
         """
@@ -93,145 +559,337 @@ class SaveInstance:
 
     def get_year(self, target_year: str) -> dict:
         """
-        Returns the dictionary for the target year
+        Returns the dictionary for the target year, laid out the same way as the old dense save format
         """
-        for year in self.data:
-            if year["year"] == str(target_year): # Checks if the value of the "year" key is the year being searched for
-                return year
-        
-        self.add_year(target_year)
-        self.get_year(target_year)
+        return {
+            "year": f"{target_year}",
+            "months": [self.get_month(target_year, month) for month in range(1, 13)]
+        }
     
     def get_month(self, target_year: str, target_month: int) -> list:
         """
         Returns a list for the target month. Target_month should be passed with the assumption that January = 1
         """
-        year = self.get_year(target_year)
+        import calendar # Only the dense compatibility views need it, so it's kept off the startup path
 
-        return year["months"][target_month - 1]
+        month_range = calendar.monthrange(int(target_year), target_month)[1]
+
+        return [{"date": str(date).rjust(2, "0"), "data": self.get_date(target_year, target_month, date)}
+                for date in range(1, month_range + 1)]
 
     def get_date(self, target_year: str, target_month: int, target_date: str) -> list:
         """
-        Returns a list of all items scheduled for the target date.
+        Returns a list of all items scheduled for the target date. Dates without items are only kept in memory,
+        and get dropped the next time the file is written
         """
-        month = self.get_month(target_year, target_month)
+        key = (int(target_year), int(target_month), int(target_date))
+
+        if key[0] not in self.loaded:
+            self.load_year(key[0])
 
-        for date in month:
-            if str(date["date"]) == str(target_date):
-                return date["data"]
+        try:
+            return self.index[key]
+        except KeyError: # First time this date has been touched, so it gets registered in both the data and the index
+            data = self.index[key] = []
+            self.data[f"{str(key[0]).rjust(4, '0')}-{str(key[1]).rjust(2, '0')}-{str(key[2]).rjust(2, '0')}"] = data
+
+            return data
     
-    def new_file(self):
+    def add_year(self, year) -> dict:
+        """
+        Handles adding new years to the file. Sparse saves don't store years at all, so this just returns its layout
         """
-        Generates a new file
+        return self.get_year(year)
+    
+    def load_file(self) -> dict:
         """
-        file_path = f"studytime/app_data/{self.file_name}.json"
-        now = datetime.today()
+        Opens the save and queues up any journalled changes. Years themselves are only read once something asks
+        for them
+        """
+        with self.lock:
+            if self.writer is not None: # Pending changes would otherwise be lost with the old data
+                self.writer.flush()
 
-        template = [{
-            "year": f"{now.year}",
-            "months": self.generate_new_year(now.year)
-        }]
-        
-        with open(file_path, "w") as f:
-            json.dump(template, f, indent = 4) # Outputs empty template for the current year to a new file
-        
-        return template
+            return self.reopen()
 
-    def add_year(self, year):
+    def reopen(self) -> dict:
         """
-        Handles adding new years to the file
+        Drops everything held in memory and opens the save again. Anything not yet handed to storage is lost, which
+        is why load_file flushes first
         """
-        file_path = f"studytime/app_data/{self.file_name}.json"
-        template = {
-                    "year": f"{year}",
-                    "months": self.generate_new_year(year)
-                    }
+        with self.lock:
+            self.data = {} # "YYYY-MM-DD" -> that date's item list, for loaded years only
+            self.index = {} # (year, month, day) -> that date's item list
 
-        """with open(file_path, "r") as f: # Loading JSON file into Python Object
-            data = json.load(f)
-        
-                for years in data:
-            if years.keys()[0] == year:
-                break
+            self.catalogue = {} # (year, month, day) -> {"date", "data"} for every loaded date that holds items
+            self.items = self.catalogue.values() # Live, read-only view of the catalogue
+            self.dates = [] # Sorted keys of the catalogue, for range searches
+            self.search = SearchIndex() # Name/subject index behind search_name
+            self.ids = {} # Item ID -> (date key, item), for every loaded item
+            self.months = {} # (year, month) -> day -> item totals for that day, see month_summary
+            self.rules = {} # Rule ID -> Rule, for every recurring item
+            self.expanded = {} # (year, month) -> day -> occurrences of recurring items, see expand_month
+
+            self.loaded = set() # Years that have been read into the structures above
+            self.pending = {} # Year -> journal records waiting for that year to be loaded
+
+            self.seq, records = self.storage.open()
+
+            for rule in self.storage.rules():
+                self.set_rule(Rule.from_dict(rule))
+
+            for record in records:
+                for change in record["records"] if record["op"] == "batch" else [record]:
+                    if change["op"] in ("rule", "unrule"): # Rules aren't tied to a year, and are few enough to apply straight away
+                        self.apply_record(change)
+                        continue
+
+                    for year in {date_key(change["date"])[0], date_key(change.get("to", change["date"]))[0]}:
+                        self.pending.setdefault(year, []).append(change) # Edits that move an item between years wait on both
+
+                self.seq = record["seq"]
+
+        return self.data
+
+    def catch_up(self, records: list, unsaved: list):
+        """
+        Takes in the journal records another process has stored since this instance last looked (or reopens the save,
+        if records is None because too much has changed to patch up), then renumbers unsaved, the changes of ours
+        that are in memory but not yet stored, to follow them. Called by the storage backend with its lock file held
+        """
+        with self.lock:
+            if records is None:
+                self.reopen()
+                for record in unsaved: # They were applied to the copy that has just been dropped
+                    self.apply_record(record)
+
+                stored = self.seq
             else:
+                stored = self.seq - len(unsaved)
+                for record in records:
+                    for change in record["records"] if record["op"] == "batch" else [record]:
+                        self.take_record(change)
+
+                    stored = max(stored, record["seq"])
+
+            for seq, record in enumerate(unsaved, stored + 1):
+                record["seq"] = seq
+
+            self.seq = stored + len(unsaved)
+            self.caught_up = True
+
+    def take_record(self, record: dict):
+        """
+        Applies a record from another process straight away if it touches a loaded year, otherwise leaves it waiting
+        for load_year like a journalled one
         """
+        if record["op"] in ("rule", "unrule"):
+            self.apply_record(record)
+            return
 
-        self.data.append(template) # Adding template to the JSON/Python object
+        years = {date_key(record["date"])[0], date_key(record.get("to", record["date"]))[0]}
 
-        with open(file_path, "w") as f: # Rewrites JSON file using updated data
-            json.dump(self.data, f, indent=4)
+        if years & self.loaded:
+            for year in sorted(years - self.loaded): # An edit moving an item in from a year we haven't read yet
+                self.load_year(year)
 
-        return template
-    
-    def load_file(self) -> dict:
+            self.apply_record(record)
+        else:
+            for year in years:
+                self.pending.setdefault(year, []).append(record)
+
+    def load_year(self, year: int):
         """
-        Loads json file given the relevant filename. If there's no corresponding file, it makes a new file.
+        Reads one year from storage and applies any journalled changes waiting on it
         """
-        file_path = f"studytime/app_data/{self.file_name}.json"
+        with self.lock:
+            if year in self.loaded:
+                return
 
-        try:
-            with open(file_path, "r") as f:
-                data = json.load(f)
-        except FileNotFoundError:
-            data = self.new_file()
+            for attempt in range(READ_ATTEMPTS):
+                if self.storage.stale(): # e.g. JSON year offsets are wrong once something else has rewritten the file
+                    self.load_file()
 
-        return data
+                # Journalled edits can move items between years, so those years have to be caught up together
+                years, queue = {year}, [year]
+                while queue:
+                    for record in self.pending.get(queue.pop(), []):
+                        for linked in {date_key(record["date"])[0], date_key(record.get("to", record["date"]))[0]} - years:
+                            years.add(linked)
+                            queue.append(linked)
 
-    def scan_items(self) -> list:
+                try: # Every year is read before any is added, so a retry starts from a clean slate
+                    read = {linked: self.storage.read_year(linked) for linked in sorted(years - self.loaded)}
+                    break
+                except FileChanged: # Rewritten by another process between the stale check and the read
+                    if attempt == READ_ATTEMPTS - 1:
+                        raise
+
+                    self.load_file()
+
+            for linked, dates in read.items():
+                self.loaded.add(linked)
+                self.add_dates(dates)
+
+            records = {id(record): record for linked in sorted(years) for record in self.pending.pop(linked, [])}
+
+            for record in sorted(records.values(), key=lambda record: record["seq"]):
+                self.apply_record(record)
+
+    def load_all(self):
         """
-        Scans through the save data for any organizational items and returns them as a list
+        Loads every year in the save. Each year takes the lock separately, so other threads are only held up briefly
         """
-        items = []
-        for year in self.data:
-            for idx, month in enumerate(year["months"]):
-                for date in month:
-                    if date["data"] != []:
-                        items.append({"date": datetime(int(year["year"]), idx + 1, int(date["date"])).strftime("%m/%d/%Y"),
-                                      "data": date["data"]}) # Pretty sure this shouldn't work, but I suppose God is smiling down on me today
-        
-        return items
+        for year in sorted(self.storage.years() | set(self.pending)):
+            self.load_year(year)
 
-    def search_name(self, name: str) -> list:
+    def add_dates(self, dates: dict):
         """
-        Searches through item list for results with specified name
+        Adds freshly read dates to the index, catalogue and search index
         """
-        query = re.compile(fr"{name.lower()}+")
-        results = []
+        keys = []
+        for key, items in dates.items():
+            date = date_key(key)
 
-        for date in self.items:
-            items = date["data"]
-            for item in items:
-                if query.findall(item["name"].lower()):
-                    item["date"] = date["date"]
-                    results.append(item)
-        
-        return sorted(results, key=lambda x: difflib.SequenceMatcher(None, x["name"], name).ratio(), reverse=True)
+            self.data[key] = self.index[date] = items
+
+            if items != []:
+                self.catalogue[date] = {"date": f"{str(date[1]).rjust(2, '0')}/{str(date[2]).rjust(2, '0')}/{date[0]}", "data": items}
+                keys.append(date)
+
+                seen = {}
+                counts = {"items": len(items), "incomplete": 0, "Task": 0, "Event": 0, "Assignment": 0} # See tally
+                for item in items:
+                    if item.id is None: # Saved before items had IDs; kept once the year is next written
+                        seen[(item.name, item.time)] = occurrence = seen.get((item.name, item.time), -1) + 1
+                        item.id = legacy_id(key, item, occurrence)
+
+                    self.ids[item.id] = (date, item)
+                    self.search.add(item, date)
+
+                    counts[item.type.value] += 1
+                    counts["incomplete"] += item.completed is False
+
+                self.months.setdefault((date[0], date[1]), {})[date[2]] = counts # Year wasn't loaded, so the day had no totals yet
+
+        keys.sort()
+        for date in keys:
+            bisect.insort(self.dates, date)
+
+    def refresh(self) -> bool:
+        """
+        Reloads the save if another process has changed it since this instance last read or wrote it. Returns True if
+        what's in memory has changed, which includes changes taken in while storing our own (see catch_up). Costs a few
+        stat calls (or one pragma for SQLite) when nothing has changed
+        """
+        caught_up, self.caught_up = self.caught_up, False # Already taken in while storing changes of our own
+
+        if not self.storage.changed():
+            return caught_up
+
+        self.load_file()
+
+        return True
 
-    def search_date(self, date_time: datetime):
+    def scan_items(self) -> list:
+        """
+        Returns the {"date", "data"} entry of every loaded date holding items, in date order. The catalogue is kept
+        current by add_dates and apply_record, so nothing has to be scanned any more
         """
-        Searches through item list for any items that match specified date
+        return [self.catalogue[key] for key in self.dates]
+
+    def search_name(self, name: str, limit: int = 10) -> list:
         """
-        query = re.compile(fr"{date_time.month}/{str(date_time.day).rjust(2, '0')}/{date_time.year}")
+        Searches the item index for the closest matches to name, returning them as save file dictionaries with their
+        "date" added
+        """
+        matches = self.storage.search(name, limit)
+
+        if matches is None:
+            self.load_all()
+            matches = self.search.search(name, limit)
+
         results = []
 
-        for date in self.items:
-            if query.findall(date["date"].lower()):
-                for item in date["data"]:
-                    results.append(item)
+        for item, key in matches:
+            results.append({**item.prepare_dict(), "date": f"{str(key[1]).rjust(2, '0')}/{str(key[2]).rjust(2, '0')}/{key[0]}"})
         
         return results
 
+    def search_date(self, date_time: datetime) -> list:
+        """
+        Returns every item scheduled on the same day as date_time
+        """
+        if date_time.year not in self.loaded:
+            self.load_year(date_time.year)
+
+        entry = self.catalogue.get((date_time.year, date_time.month, date_time.day))
+        items = list(entry["data"]) if entry is not None else []
+
+        if self.rules:
+            occurrences = self.expand_month(date_time.year, date_time.month).get(date_time.day)
+
+            if occurrences:
+                items = sorted(items + occurrences, key=lambda x : x.time)
+
+        return items
+
+    def search_range(self, start: datetime, end: datetime) -> list:
+        """
+        Returns the catalogue entries ({"date", "data"}) for every date from start to end inclusive that holds items,
+        in date order. Meant for week and month overviews
+        """
+        for year in sorted(self.storage.years() | set(self.pending)):
+            if start.year <= year <= end.year:
+                self.load_year(year)
+
+        first = bisect.bisect_left(self.dates, (start.year, start.month, start.day))
+        last = bisect.bisect_right(self.dates, (end.year, end.month, end.day))
+
+        entries = [self.catalogue[key] for key in self.dates[first:last]]
+
+        if not self.rules:
+            return entries
+
+        # Recurring items are worked out a month at a time, only for the months in the range that a rule could fall in
+        merged = {key: entry for key, entry in zip(self.dates[first:last], entries)}
+        months = set()
+
+        for rule in self.rules.values():
+            months.update(rule.months(date(start.year, start.month, start.day), date(end.year, end.month, end.day)))
+
+        for year, month in sorted(months):
+            for day, occurrences in self.expand_month(year, month).items():
+                key = (year, month, day)
+                if not (start.year, start.month, start.day) <= key <= (end.year, end.month, end.day):
+                    continue
+
+                items = merged[key]["data"] + occurrences if key in merged else occurrences
+                merged[key] = {"date": f"{str(month).rjust(2, '0')}/{str(day).rjust(2, '0')}/{year}",
+                               "data": sorted(items, key=lambda x : x.time)}
+
+        return [merged[key] for key in sorted(merged)]
+
     def save_changes(self):
         """
         Writes the contents of this save instance's data attribute over the save file
         """
-        file_path = f"studytime/app_data/{self.file_name}.json"
+        if self.writer is not None:
+            self.writer.flush()
 
-        with open(file_path, "w") as f:
-            json.dump(self.data, f, indent=4)
-        
-        self.scan_items()
+        self.storage.write()
+
+    def close(self):
+        """
+        Finishes any background work, including writing out pending changes, and closes the storage backend
+        """
+        if self.writer is not None:
+            self.writer.close()
+
+        if self.notifications is not None:
+            self.notifications.stop()
 
+        self.storage.close()
 
     def organise_times(self, data):
         """
@@ -241,150 +899,147 @@ class SaveInstance:
         for year in data: # Accessing year array
             self.years.append(Year(year))
     
-    def set_notification(self, item: dict, time: datetime, descr: str):
-        """
-        Sets a Windows Toast Notification for the item
-        """
-        scheduler = win32com.client.Dispatch('Schedule.Service')
-        scheduler.Connect()
-        root_folder = scheduler.GetFolder('\\')
-        task_def = scheduler.NewTask(0)
-
-        # Create trigger
-        start_time = time
-        TASK_TRIGGER_TIME = 1
-        trigger = task_def.Triggers.Create(TASK_TRIGGER_TIME)
-        trigger.StartBoundary = start_time.isoformat()
-
-        # Create action
-        TASK_ACTION_EXEC = 0
-        action = task_def.Actions.Create(TASK_ACTION_EXEC)
-        action.ID = 'ExecAction'
-        # action.Path = r'C:\Users\Jake Hickey\Documents\Schoolwork\Applied Computing Folio\StudyPlanner\.venv\Scripts\python.exe'
-        # action.WorkingDirectory = r'C:\Users\Jake Hickey\Documents\Schoolwork\Applied Computing Folio\StudyPlanner'
-        action.Path = f'{str(Path.cwd())}\.venv\Scripts\python.exe'
-        action.WorkingDirectory = f'{str(Path.cwd())}'
-        
-        action.Arguments = f'create_notif.py "{item["name"]}" "{descr}"'
+    def get_notifications(self) -> NotificationScheduler:
+        """
+        Returns the reminder scheduler for this save, reading its queue the first time it's needed
+        """
+        if self.notifications is None:
+            self.notifications = NotificationScheduler(f"{self.storage.directory}/{self.file_name}.notifications")
 
-        # Set parameters
-        task_def.RegistrationInfo.Description = descr
-        task_def.Settings.Enabled = True
-        task_def.Settings.StopIfGoingOnBatteries = False
+        return self.notifications
 
-        # Register task
-        # If task already exists, it will be updated
-        TASK_CREATE_OR_UPDATE = 6
-        TASK_LOGON_NONE = 0
+    def has_notifications(self) -> bool:
+        """
+        Checks whether this save has ever had notifications, without reading them in
+        """
+        path = f"{self.storage.directory}/{self.file_name}.notifications"
 
-        name = f'{item["name"]} {time.strftime("%m_%d_%Y %H_%M_%S")}'.replace(':', '_')
-        
-        root_folder.RegisterTaskDefinition(
-            name,  # Task name
-            task_def,
-            TASK_CREATE_OR_UPDATE,
-            '',  # No user
-            '',  # No password
-            TASK_LOGON_NONE)
+        return self.notifications is not None or os.path.exists(path) or os.path.exists(f"{path}.journal")
 
-    def remove_notification(self, item: dict, time: datetime):
+    def set_notification(self, item_id: str, time: datetime, descr: str):
         """
-        Removes the notification
+        Queues a notification for the item, shown by the reminder scheduler at the given time
         """
-        scheduler = win32com.client.Dispatch("Schedule.Service")
-        scheduler.Connect()
-        root_folder = scheduler.GetFolder("\\")
-        
-        root_folder.DeleteTask()
+        self.set_notifications([(item_id, time, descr)])
 
-        item_id = f"{item['time']} {time.strftime('%m-%d-%Y %H:%M:%S')}"
-        root_folder.DeleteTask(item_id, 0)
+    def set_notifications(self, reminders: list):
+        """
+        Queues (item_id, time, descr) notifications together, in a single write
+        """
+        records = []
+        for item_id, time, descr in reminders:
+            key, item = self.locate(item_id)
+            records.append(schedule_record(notification_key(item_id, time), item.name, descr or "No description given", time,
+                                           item_id, key_text(key)))
 
+        self.get_notifications().commit(records)
 
-class Task:
-    """
-    The standard type of StudyTime object, this indicates any one-time activity that is set for the user to complete by a certain time
-    """
-    def __init__(self, name: str, date: datetime, subject):
+    def get_item_notifications(self, item_id: str) -> list:
         """
-        Creates a dictionary object
+        Returns the pending notifications for an item, soonest first
         """
-        self.name = name
-        self.date = f"{date.year}-{date.month}-{str(date.day).rjust(2, '0')}"
-        self.time = date.time().strftime("%H:%M:%S")
-        self.subject = subject
-        self.completed = False
-    
-    def prepare_dict(self):
+        return self.get_notifications().for_item(item_id)
+
+    def remove_notification(self, item_id: str, time: datetime) -> bool:
         """
-        Returns a dictionary for the purpose of storing within the save instance
+        Removes one of the item's notifications, returning False if there wasn't one
         """
-        data = {
-            "name": f"{self.name}",
-            "subject": f"{self.subject}",
-            "time": f"{self.time}",
-            "completed": f"{self.completed}",
-            "type": "Task"
-        }
+        return self.get_notifications().cancel(notification_key(item_id, time))
+
+    def cancel_notifications(self, item_ids: list) -> int:
+        """
+        Removes every notification for the given items in a single write, returning how many were removed
+        """
+        if not self.has_notifications():
+            return 0
 
-        return data
+        return self.get_notifications().cancel_items(item_ids)
 
-    def edit(self, data: dict):
-        self.name = data["name"]
-        
-        date_time = data["date"]
-        self.date = f"{date_time.year}-{date_time.month}-{str(date_time.day).rjust(2, '0')}"
-        self.time = date_time.time().strftime("%H:%M:%S")
-        self.subject = data["subject"]
+    def reschedule_notifications(self, moves: list) -> int:
+        """
+        Shifts the notifications of items that have moved, given (item_id, timedelta) pairs, so each keeps the same
+        lead time before its item. Returns how many were moved
+        """
+        if not self.has_notifications():
+            return 0
+
+        scheduler = self.get_notifications()
+        records = []
+
+        with scheduler.condition:
+            for item_id, delta in moves:
+                location = self.locate(item_id)
+
+                for reminder in scheduler.for_item(item_id):
+                    due = datetime.fromisoformat(reminder["due"]) + delta
+
+                    records.append({"op": "cancel", "key": reminder["key"]})
+                    records.append(schedule_record(notification_key(item_id, due), location[1].name, reminder["message"], due,
+                                                   item_id, key_text(location[0])))
 
-    def mark_completed(self, complete: bool):
-        self.completed = complete
+            scheduler.commit(records)
 
-class Event:
+        return len(records) // 2
+
+    def reconcile_notifications(self) -> int:
+        """
+        Cancels, in one write, any notifications whose item no longer exists, e.g. because it was removed from a
+        script or another copy of the app. Only the years those items were last seen in are loaded. Returns how
+        many were cancelled
+        """
+        if not self.has_notifications():
+            return 0
+
+        scheduler = self.get_notifications()
+        scheduler.refresh()
+
+        with scheduler.condition:
+            items = {reminder["item"]: reminder.get("item_date") for reminder in scheduler.reminders.values() if reminder["item"] is not None}
+
+        orphans = []
+        for item_id, item_date in items.items():
+            if item_date is not None:
+                self.load_year(int(item_date[:4]))
+
+            if item_id not in self.ids and self.locate(item_id) is None: # Falls back to every year if it's moved since
+                orphans.append(item_id)
+
+        return scheduler.cancel_items(orphans)
+
+# Timed when instrumentation is on (see studytime.instrument); left untouched otherwise
+instrument.register(SaveInstance, "load_file", "load_year", "save_changes", "scan_items", "search_name", "search_date",
+                    "search_range", "month_summary", "expand_month", "add_item", "remove_item", "edit_item", "commit")
+instrument.register(SearchIndex, "search")
+instrument.register(JsonStorage, "open", "read_year", "persist", "write", "run_compaction")
+instrument.register(SqliteStorage, "read_year", "persist_batch", "search")
+
+def notification_key(item_id: str, time: datetime) -> str:
     """
-    An activity that automatically marks itself as completed after the time slot regardless of user input
+    Identifies one of an item's notifications by the time it goes off
     """
-    def __init__(self, name: str, date: datetime):
-        self.name = name
-        self.date = date
-        self.time = date.time().strftime("%H:%M:%S")
-    
-    def prepare_dict(self) -> dict:
-        data = {
-            "name": f"{self.name}",
-            "time": f"{self.time}",
-            "type": "Event"
-        }
+    return f"{item_id} @ {time.strftime('%Y-%m-%d %H:%M:%S')}"
 
-        return data
+def key_text(key: tuple) -> str:
+    """
+    Converts a (year, month, day) key back into the "YYYY-MM-DD" form used in the save file
+    """
+    return f"{str(key[0]).rjust(4, '0')}-{str(key[1]).rjust(2, '0')}-{str(key[2]).rjust(2, '0')}"
 
-class Assignment:
+def date_key(key: str) -> tuple:
     """
-    A cross between an event and an activity, automatically marking itself as completed, while still being tied to a subject
+    Converts a "YYYY-MM-DD" save file key into the (year, month, day) tuple used by SaveInstance.index
     """
-    def __init__(self, name: str, date: datetime, subject: str):
-        self.name = name
-        self.date = date
-        self.time = date.time().strftime("%H:%M:%S")
-        self.subject = subject
-        self.completed = False
-    
-    def prepare_dict(self):
-        data = {
-            "name": f"{self.name}",
-            "time": f"{self.time}",
-            "subject": f"{self.subject}",
-            "completed": f"{self.completed}",
-            "type": "Assignment"
-        }
+    year, month, day = key.split("-")
 
-        return data
+    return int(year), int(month), int(day)
 
 def map_dates(year: int, month: int) -> list:
     """
     Maps all dates in the month to weekdays for use in calendar, and returns a tuple containg the first weekday of the month, and the final day
     """
 
+    import calendar
+
     year, month = int(year), int(month)
     starting_weekday, month_range = calendar.monthrange(year, month)
     
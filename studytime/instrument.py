@@ -0,0 +1,237 @@
+"""
+studytime.instrument
+
+Author: Jake Hickey
+Description: Opt-in timing of hot paths, with optional cProfile and tracemalloc capture. Turned on by setting the
+STUDYTIME_PROFILE environment variable (or --profile) to "timing", "cprofile" and/or "tracemalloc", comma separated.
+When it's off, nothing is wrapped, so it costs nothing
+"""
+
+# Imports
+import atexit, functools, inspect, os, sys, threading, time
+
+MODES = ("timing", "cprofile", "tracemalloc")
+BUCKETS = (0.01, 0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000) # Histogram upper bounds in milliseconds; the last bucket is anything slower
+
+TARGETS = [] # (owner, attribute, label) for every hot path registered
+ENABLED = set() # Modes currently on
+
+STATS = {} # Label -> {"calls", "total_ms", "min_ms", "max_ms", "buckets"}
+LOCK = threading.Lock()
+
+PROFILER = None
+
+def register(owner, *names, prefix: str = None):
+    """
+    Marks methods of a class (or functions of a module) as hot paths. They're only wrapped once timing is enabled
+    """
+    prefix = prefix or getattr(owner, "__name__", f"{owner}")
+
+    for name in names:
+        target = (owner, name, f"{prefix}.{name}")
+        TARGETS.append(target)
+
+        if "timing" in ENABLED:
+            wrap(*target)
+
+def wrap(owner, name: str, label: str):
+    func = getattr(owner, name)
+    if getattr(func, "instrumented", False):
+        return
+
+    # Qt calls a slot with as many of a signal's arguments as it takes (e.g. data_clicked(self) for clicked(QDate)),
+    # which *args would hide, so extras are dropped the same way for anything without *args of its own
+    parameters = inspect.signature(func).parameters.values()
+    arity = None if any(param.kind == param.VAR_POSITIONAL for param in parameters) else \
+        sum(param.kind in (param.POSITIONAL_ONLY, param.POSITIONAL_OR_KEYWORD) for param in parameters)
+
+    @functools.wraps(func)
+    def timed(*args, **kwargs):
+        if arity is not None:
+            args = args[:arity]
+
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record(label, (time.perf_counter() - start) * 1000)
+
+    timed.instrumented = True
+    setattr(owner, name, timed)
+
+def record(label: str, elapsed: float):
+    """
+    Adds one call taking elapsed milliseconds to a hot path's stats
+    """
+    with LOCK:
+        stats = STATS.get(label)
+        if stats is None:
+            stats = STATS[label] = {"calls": 0, "total_ms": 0.0, "min_ms": elapsed, "max_ms": elapsed, "buckets": [0] * (len(BUCKETS) + 1)}
+
+        stats["calls"] += 1
+        stats["total_ms"] += elapsed
+        stats["min_ms"] = min(stats["min_ms"], elapsed)
+        stats["max_ms"] = max(stats["max_ms"], elapsed)
+
+        for idx, bound in enumerate(BUCKETS):
+            if elapsed <= bound:
+                stats["buckets"][idx] += 1
+                break
+        else:
+            stats["buckets"][-1] += 1
+
+def parse_modes(text: str) -> set:
+    modes = set()
+    for mode in text.lower().split(","):
+        mode = mode.strip()
+
+        if mode in ("", "0", "off"):
+            continue
+
+        if mode in ("1", "on"):
+            mode = "timing"
+
+        if mode not in MODES:
+            raise ValueError(f"unknown profiling mode {mode!r}, expected some of {', '.join(MODES)}")
+
+        modes.add(mode)
+
+    return modes
+
+def enable(modes="timing"):
+    """
+    Turns on the given modes (a set, or text like "timing,tracemalloc"). Stats are dumped when the process exits
+    """
+    global PROFILER
+
+    modes = parse_modes(modes) if isinstance(modes, str) else set(modes)
+    if not modes - ENABLED:
+        return
+
+    if not ENABLED:
+        atexit.register(dump_on_exit)
+
+    if "timing" in modes and "timing" not in ENABLED:
+        for target in TARGETS:
+            wrap(*target)
+
+    if "cprofile" in modes and PROFILER is None:
+        import cProfile
+
+        PROFILER = cProfile.Profile()
+        PROFILER.enable()
+
+    if "tracemalloc" in modes:
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+
+    ENABLED.update(modes)
+
+def reset():
+    """
+    Clears the timing stats, and the cProfile and tracemalloc captures
+    """
+    with LOCK:
+        STATS.clear()
+
+    if PROFILER is not None:
+        PROFILER.clear()
+
+    if "tracemalloc" in ENABLED:
+        import tracemalloc
+        tracemalloc.clear_traces()
+        tracemalloc.reset_peak()
+
+def percentile(stats: dict, fraction: float) -> float:
+    """
+    Estimates a percentile from the histogram, as the upper bound of the bucket it falls in
+    """
+    target, seen = fraction * stats["calls"], 0
+
+    for idx, count in enumerate(stats["buckets"]):
+        seen += count
+        if seen >= target and count:
+            return BUCKETS[idx] if idx < len(BUCKETS) else stats["max_ms"]
+
+    return stats["max_ms"]
+
+def report(limit: int = 25) -> str:
+    """
+    Returns the stats so far as readable text
+    """
+    lines = []
+
+    if "timing" in ENABLED:
+        with LOCK:
+            rows = sorted(STATS.items(), key=lambda row: row[1]["total_ms"], reverse=True)
+
+        lines.append(f"{'hot path':<34} {'calls':>7} {'total ms':>10} {'mean ms':>9} {'p50 <=':>8} {'p99 <=':>8} {'max ms':>9}")
+        for label, stats in rows:
+            lines.append(f"{label:<34} {stats['calls']:>7} {stats['total_ms']:>10.1f} {stats['total_ms'] / stats['calls']:>9.3f} "
+                         f"{percentile(stats, 0.5):>8} {percentile(stats, 0.99):>8} {stats['max_ms']:>9.2f}")
+
+    if PROFILER is not None:
+        import io, pstats
+
+        text = io.StringIO()
+        pstats.Stats(PROFILER, stream=text).sort_stats("cumulative").print_stats(limit)
+        lines.append(text.getvalue())
+
+    if "tracemalloc" in ENABLED:
+        import tracemalloc
+
+        current, peak = tracemalloc.get_traced_memory()
+        lines.append(f"traced memory: {current / 1024:.0f} KiB now, {peak / 1024:.0f} KiB peak")
+
+        for stat in tracemalloc.take_snapshot().statistics("lineno")[:limit]:
+            lines.append(f"  {stat}")
+
+    return "\n".join(lines)
+
+def dump(directory: str = None) -> str:
+    """
+    Writes the stats out to <directory>/studytime-profile-<time>.json (with a .prof alongside for cProfile, which
+    snakeviz and pstats can read), returning the JSON file's path. The directory defaults to STUDYTIME_PROFILE_DIR,
+    or the working directory
+    """
+    import json
+
+    directory = directory or os.environ.get("STUDYTIME_PROFILE_DIR", ".")
+    path = f"{directory}/studytime-profile-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+
+    with LOCK:
+        stats = {label: {**values, "p50_ms": percentile(values, 0.5), "p99_ms": percentile(values, 0.99)}
+                 for label, values in STATS.items()}
+
+    data = {"modes": sorted(ENABLED), "buckets_ms": list(BUCKETS), "stats": stats}
+
+    if PROFILER is not None:
+        PROFILER.dump_stats(f"{path}.prof")
+        data["cprofile"] = f"{path}.prof"
+
+    if "tracemalloc" in ENABLED:
+        import tracemalloc
+
+        current, peak = tracemalloc.get_traced_memory()
+        data["memory"] = {"current_kib": current / 1024, "peak_kib": peak / 1024,
+                          "top": [f"{stat}" for stat in tracemalloc.take_snapshot().statistics("lineno")[:25]]}
+
+    with open(f"{path}.json", "w") as f:
+        json.dump(data, f, indent=2)
+
+    return f"{path}.json"
+
+def dump_on_exit():
+    try:
+        path = dump()
+    except OSError as error:
+        print(f"couldn't write profiling stats: {error}", file=sys.stderr)
+        return
+
+    print(report(), file=sys.stderr)
+    print(f"profiling stats written to {path}", file=sys.stderr)
+
+if os.environ.get("STUDYTIME_PROFILE"):
+    enable(os.environ["STUDYTIME_PROFILE"])
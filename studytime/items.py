@@ -0,0 +1,149 @@
+"""
+studytime.items
+
+Author: Jake Hickey
+Description: Compact in-memory records for organisational items, and their conversion to and from the save format
+"""
+
+# Imports
+from datetime import datetime, time
+from enum import Enum
+
+import os, sys
+
+__all__ = ["ItemType", "Item", "Task", "Event", "Assignment", "ITEM_CLASSES", "parse_time", "new_id", "legacy_id"] # Keeps datetime.time out of star imports
+
+class ItemType(Enum):
+    TASK = "Task"
+    EVENT = "Event"
+    ASSIGNMENT = "Assignment"
+
+TIMES = {} # "HH:MM:SS" -> shared time object, since most items sit on a handful of times of day
+
+def parse_time(text: str) -> time:
+    """
+    Returns the (shared) time object for a "HH:MM:SS" string
+    """
+    try:
+        return TIMES[text]
+    except KeyError:
+        value = TIMES[text] = time.fromisoformat(text)
+        return value
+
+def new_id() -> str:
+    """
+    Returns a fresh item ID. Random rather than counted, so saves edited by different copies of the app can't clash
+    """
+    return os.urandom(8).hex()
+
+def legacy_id(date: str, item, occurrence: int) -> str:
+    """
+    Derives an ID for an item saved before items had them, from its date, time, name and how many identical items
+    come before it that day. It stays the same from one load to the next, until the item is saved with it for good
+    """
+    import hashlib # Only saves from before IDs ever get here
+
+    text = f"{date} {item.time} {item.name} {occurrence}"
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+class Item:
+    """
+    A single organisational item. The date isn't stored, since it's already the key the item is filed under
+    """
+    __slots__ = ("id", "name", "type", "time", "subject", "completed")
+
+    FIELDS = ("id", "name", "subject", "time", "completed") # Save file key order, before "type"
+
+    def __init__(self, name: str, type: ItemType, item_time: time, subject: str = None, completed: bool = None, id: str = None):
+        self.id = id or new_id() # Stays the same however the item is edited or moved
+        self.name = sys.intern(name) # Recurring names and subjects share one string between every item
+        self.type = type
+        self.time = item_time
+        self.subject = sys.intern(subject) if subject is not None else None
+        self.completed = completed # None for events, which can't be completed
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """
+        Builds the right kind of item from its save file dictionary
+        """
+        kind = data["type"]
+        item = object.__new__(ITEM_CLASSES[kind]) # Skips the subclass constructors, which expect a datetime
+
+        item.id = data.get("id") # None for items saved before IDs; SaveInstance gives those a legacy_id
+        item.name = sys.intern(data["name"])
+        item.type = ITEM_TYPES[kind]
+        item.time = TIMES.get(data["time"]) or parse_time(data["time"])
+
+        subject = data.get("subject")
+        item.subject = sys.intern(subject) if subject is not None else None
+
+        completed = data.get("completed")
+        item.completed = completed == "True" if completed is not None else None
+
+        return item
+
+    def prepare_dict(self) -> dict:
+        """
+        Returns a dictionary for the purpose of storing within the save file
+        """
+        data = {}
+        for field in self.FIELDS:
+            value = getattr(self, field)
+
+            if value is not None:
+                data[field] = value.strftime("%H:%M:%S") if field == "time" else f"{value}"
+
+        data["type"] = self.type.value
+
+        return data
+
+    def update(self, data: dict):
+        """
+        Overwrites every field (type included) from a save file dictionary, keeping the same ID and object
+        """
+        kind = data["type"]
+        self.__class__ = ITEM_CLASSES[kind] # Every item class has the same slots, so this is allowed
+        self.type = ITEM_TYPES[kind]
+
+        self.name = sys.intern(data["name"])
+        self.time = parse_time(data["time"])
+
+        subject, completed = data.get("subject"), data.get("completed")
+        self.subject = sys.intern(subject) if subject is not None else None
+        self.completed = completed == "True" if completed is not None else None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.name!r}, {self.time}, {self.subject!r}, {self.completed})"
+
+class Task(Item):
+    """
+    The standard type of StudyTime object, this indicates any one-time activity that is set for the user to complete by a certain time
+    """
+    __slots__ = ()
+
+    def __init__(self, name: str, date: datetime, subject):
+        super().__init__(name, ItemType.TASK, date.time().replace(microsecond=0), subject, False)
+
+class Event(Item):
+    """
+    An activity that automatically marks itself as completed after the time slot regardless of user input
+    """
+    __slots__ = ()
+    FIELDS = ("id", "name", "time")
+
+    def __init__(self, name: str, date: datetime):
+        super().__init__(name, ItemType.EVENT, date.time().replace(microsecond=0))
+
+class Assignment(Item):
+    """
+    A cross between an event and an activity, automatically marking itself as completed, while still being tied to a subject
+    """
+    __slots__ = ()
+    FIELDS = ("id", "name", "time", "subject", "completed")
+
+    def __init__(self, name: str, date: datetime, subject: str):
+        super().__init__(name, ItemType.ASSIGNMENT, date.time().replace(microsecond=0), subject, False)
+
+ITEM_CLASSES = {"Task": Task, "Event": Event, "Assignment": Assignment}
+ITEM_TYPES = {kind.value: kind for kind in ItemType} # Saves the slower ItemType("Task") lookup for every item loaded
@@ -0,0 +1,191 @@
+"""
+studytime.journal
+
+Author: Jake Hickey
+Description: An append-only change journal, so that saving one item doesn't mean rewriting the whole save file
+"""
+
+# Imports
+if __name__ == "__main__":
+    from savefile import sync_directory
+    import codec
+else:
+    from studytime.savefile import sync_directory
+    from studytime import codec
+
+import os
+
+class Journal:
+    """
+    Write-ahead log for a save file. Every change is appended as one JSON line, and gets folded back into the
+    snapshot by SaveInstance.compact once the journal grows past its threshold
+    """
+    def __init__(self, path: str, threshold: int = 1024 * 1024):
+        self.path = path
+        self.old_path = f"{path}.old" # Journal that is currently being compacted (or was, if we crashed mid-way)
+        self.threshold = threshold # Size in bytes before compaction is triggered
+
+        self.handle = None
+        self.size, self.identity = 0, None # Bytes of the journal this process has read or written, and which file
+        self.reset()
+
+    def append(self, record: dict):
+        """
+        Appends a single record to the journal, returning once it has reached the disk. Costs the same no matter how big
+        the save file is
+        """
+        if self.handle is None:
+            created = not os.path.exists(self.path)
+            self.size = trim_torn_line(self.path) # Otherwise this record would be glued onto a torn one and lost with it
+            self.handle = open(self.path, "ab")
+
+            stat = os.fstat(self.handle.fileno())
+            self.identity = (stat.st_dev, stat.st_ino)
+
+            if created: # The new directory entry has to survive a power cut too, not just the data
+                sync_directory(self.path)
+
+        line = codec.dumps(record) + b"\n"
+
+        self.handle.write(line)
+        self.handle.flush()
+        os.fsync(self.handle.fileno())
+        self.size += len(line)
+
+    def needs_compaction(self) -> bool:
+        return self.size >= self.threshold
+
+    def records(self, after_seq: int = 0):
+        """
+        Yields every record newer than after_seq, oldest first, across both the old and current journal
+        """
+        for path in (self.old_path, self.path):
+            if not os.path.exists(path):
+                continue
+
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        record = codec.loads(line)
+                    except codec.DecodeError: # A torn final line from a crash mid-append; everything before it is fine
+                        break
+
+                    if record["seq"] > after_seq:
+                        yield record
+
+    def unread(self):
+        """
+        Returns the records other processes have appended since this journal was last reset, read or written, or None
+        if it has been swapped for another file in the meantime (e.g. rotated by a compaction). Only reliable while
+        holding the save's lock file, so nothing is mid-append
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None if self.identity is not None else []
+
+        if self.identity not in (None, (stat.st_dev, stat.st_ino)) or stat.st_size < self.size:
+            return None
+
+        if stat.st_size == self.size:
+            return []
+
+        with open(self.path, "rb") as f:
+            f.seek(self.size)
+            data = f.read()
+
+        records = []
+        for line in data.splitlines(keepends=True):
+            try:
+                record = codec.loads(line) if line.endswith(b"\n") else None
+            except codec.DecodeError:
+                record = None
+
+            if record is None: # A torn final line from another process crashing mid-append
+                self.close() # So the next append trims it off first
+                break
+
+            records.append(record)
+            self.size += len(line)
+
+        self.identity = (stat.st_dev, stat.st_ino)
+
+        return records
+
+    def rotate(self):
+        """
+        Moves the current journal aside so compaction can work on it while new records go to a fresh file
+        """
+        self.close()
+
+        if not os.path.exists(self.path):
+            return
+
+        if os.path.exists(self.old_path): # Leftover from an interrupted compaction, so the two are merged instead
+            trim_torn_line(self.old_path)
+            with open(self.old_path, "ab") as old, open(self.path, "rb") as current:
+                old.write(current.read())
+                old.flush()
+                os.fsync(old.fileno()) # Before the only other copy of these records is removed
+            os.remove(self.path)
+        else:
+            os.replace(self.path, self.old_path)
+
+        sync_directory(self.path)
+
+        self.size, self.identity = 0, None
+
+    def discard_old(self):
+        """
+        Deletes the rotated journal once its records are safely inside a snapshot
+        """
+        if os.path.exists(self.old_path):
+            os.remove(self.old_path)
+
+    def reset(self):
+        """
+        Drops the open handle and re-reads the size, for when another process has rewritten the journal
+        """
+        self.close()
+
+        try:
+            stat = os.stat(self.path)
+            self.size, self.identity = stat.st_size, (stat.st_dev, stat.st_ino)
+        except FileNotFoundError:
+            self.size, self.identity = 0, None
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+
+def trim_torn_line(path: str) -> int:
+    """
+    Cuts a torn final line (from a crash mid-append) off the end of a journal file, so that whatever gets appended next
+    starts on a line of its own. Returns the size of the file afterwards
+    """
+    if not os.path.exists(path):
+        return 0
+
+    with open(path, "r+b") as f:
+        end = f.seek(0, os.SEEK_END)
+        keep = end
+
+        while keep > 0: # Walk back a block at a time to the last newline
+            start = max(keep - 4096, 0)
+            f.seek(start)
+            block = f.read(keep - start)
+
+            if start + len(block) == end and block.endswith(b"\n"): # Nothing torn
+                return end
+
+            newline = block.rfind(b"\n")
+            if newline != -1:
+                keep = start + newline + 1
+                break
+
+            keep = start
+
+        f.truncate(keep)
+
+    return keep
@@ -0,0 +1,70 @@
+"""
+studytime.lockfile
+
+Author: Jake Hickey
+Description: An advisory lock file, so separate processes (e.g. the app and the command line tool) take turns changing
+a save
+"""
+
+# Imports
+import os
+
+if os.name == "posix":
+    import fcntl
+else:
+    import msvcrt
+
+class LockFile:
+    """
+    Exclusive lock shared between processes through a file next to the save. It can be taken again by whoever already
+    holds it, but doesn't keep threads apart by itself, so callers take the save's lock first
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.handle = None # Kept open between uses, since locking is per open file
+        self.depth = 0 # How many times the current holder has taken it
+
+    def __enter__(self):
+        if self.depth == 0:
+            if self.handle is None:
+                self.handle = open(self.path, "a+b")
+
+            lock(self.handle)
+
+        self.depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self.depth -= 1
+
+        if self.depth == 0:
+            unlock(self.handle)
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+
+def lock(handle):
+    """
+    Blocks until this process holds the lock on handle's file
+    """
+    if os.name == "posix":
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        return
+
+    handle.seek(0) # msvcrt locks bytes from the current position, so everyone has to agree on the first one
+    while True:
+        try:
+            msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError: # LK_LOCK gives up after about ten seconds, e.g. while another process compacts a big save
+            continue
+
+def unlock(handle):
+    if os.name == "posix":
+        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+        return
+
+    handle.seek(0)
+    msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,420 @@
+"""
+studytime.notifications
+
+Author: Jake Hickey
+Description: A single reminder scheduler that sleeps until the next notification is due, in place of one Windows
+scheduled task (and one Python process) per reminder
+"""
+
+# Imports
+if __name__ == "__main__":
+    from journal import Journal
+    from lockfile import LockFile
+    from savefile import write_atomic
+    import codec
+else:
+    from studytime.journal import Journal
+    from studytime.lockfile import LockFile
+    from studytime.savefile import write_atomic
+    from studytime import codec
+
+from datetime import datetime
+
+import heapq, os, sys, threading, time
+
+class NotificationBackend:
+    """
+    Something that can put a notification in front of the user. Backends import their libraries on first use
+    """
+    def show(self, title: str, message: str):
+        raise NotImplementedError
+
+class ToastBackend(NotificationBackend):
+    """
+    Windows toast notifications through win10toast
+    """
+    def __init__(self):
+        self.toaster = None
+
+    def show(self, title: str, message: str):
+        if self.toaster is None:
+            from win10toast import ToastNotifier
+            self.toaster = ToastNotifier()
+
+        self.toaster.show_toast(title, message, duration=10, threaded=True)
+
+class LibnotifyBackend(NotificationBackend):
+    """
+    Desktop notifications on Linux, over D-Bus through libnotify, or the notify-send command if the bindings aren't there
+    """
+    def __init__(self):
+        self.notify = None
+
+    def show(self, title: str, message: str):
+        if self.notify is None:
+            try:
+                import gi
+                gi.require_version("Notify", "0.7")
+                from gi.repository import Notify
+
+                Notify.init("StudyTime")
+                self.notify = Notify
+            except (ImportError, ValueError):
+                self.notify = False
+
+        if self.notify:
+            self.notify.Notification.new(title, message).show()
+        else:
+            import subprocess
+            subprocess.run(["notify-send", "--app-name=StudyTime", title, message], check=False)
+
+class StubBackend(NotificationBackend):
+    """
+    Keeps every notification in a list instead of showing it, for tests and machines without a desktop
+    """
+    def __init__(self):
+        self.shown = [] # (title, message) in the order they fired
+
+    def show(self, title: str, message: str):
+        self.shown.append((title, message))
+
+BACKENDS = {"toast": ToastBackend, "libnotify": LibnotifyBackend, "stub": StubBackend}
+
+def default_backend() -> NotificationBackend:
+    """
+    Picks the backend for this platform, falling back to the stub where there's nothing to show notifications with
+    """
+    if sys.platform == "win32":
+        return ToastBackend()
+
+    if sys.platform.startswith("linux"):
+        import shutil
+
+        if shutil.which("notify-send") or os.environ.get("DBUS_SESSION_BUS_ADDRESS"):
+            return LibnotifyBackend()
+
+    return StubBackend()
+
+def schedule_record(key: str, title: str, message: str, due: datetime, item: str = None, item_date: str = None) -> dict:
+    """
+    Builds a schedule record. item_date is where the item was when the reminder was set, so checking the item still
+    exists only means loading that year
+    """
+    return {"op": "schedule", "key": key, "title": title, "message": message, "due": due.isoformat(), "item": item,
+            "item_date": item_date}
+
+class NotificationScheduler:
+    """
+    Holds every pending reminder in a heap ordered by due time, so scheduling and cancelling are O(log n) however many
+    are waiting. Changes are journalled, so the queue survives restarts, and a background thread fires each reminder
+    as it comes due. Several processes (e.g. the app and python -m studytime notify) can share a queue: each takes the
+    lock file and catches up on the others' changes before making its own
+    """
+    def __init__(self, path: str, backend: NotificationBackend = None, threshold: int = 256 * 1024):
+        self.path = path # Snapshot of the queue; changes since then are in <path>.journal
+        self.backend = backend or default_backend()
+        self.journal = Journal(f"{path}.journal", threshold)
+        self.lock_file = LockFile(f"{path}.lock") # Taken after the condition, never before it
+
+        self.reminders = {} # Key -> {"key", "title", "message", "due", "item", "item_date"}, for every pending reminder
+        self.by_item = {} # Item ID -> set of the keys of its pending reminders
+        self.heap = [] # (due timestamp, order, key); entries whose order is out of date have been cancelled or moved
+        self.orders = {} # Key -> order of its live heap entry
+        self.order = 0
+        self.seq = 0 # Sequence number of the last change, shared with the journal
+        self.snapshot_size = 0 # Journal is only compacted once it outgrows the snapshot, keeping rewrites amortised O(1)
+        self.stamp = None # Modification time and size of the snapshot and journals as of the last catch up
+
+        self.condition = threading.Condition() # Guards all of the above, and wakes the thread when the queue changes
+        self.thread = None
+        self.running = False
+
+        self.load()
+
+    def load(self):
+        """
+        Reads the snapshot and replays the journal on top of it. Reminders that came due while nothing was running
+        stay in the queue, and fire as soon as the scheduler starts
+        """
+        with self.condition, self.lock_file:
+            self.reminders, self.by_item, self.heap, self.orders = {}, {}, [], {}
+
+            try:
+                with open(self.path, "rb") as f:
+                    content = f.read()
+
+                snapshot, self.snapshot_size = codec.loads(content), len(content)
+            except FileNotFoundError:
+                snapshot = {"seq": 0, "reminders": []}
+
+            self.seq = snapshot["seq"]
+
+            for reminder in snapshot["reminders"]:
+                self.apply({"op": "schedule", **reminder})
+
+            for record in self.journal.records(self.seq):
+                self.apply(record)
+                self.seq = record["seq"]
+
+            self.journal.reset() # Picks up from the end of what was just read
+            self.stamp = self.file_stamp()
+
+    def file_stamp(self) -> tuple:
+        """
+        Returns the modification time and size of the snapshot and both journals, for spotting other processes' changes
+        """
+        stamp = []
+        for path in (self.path, self.journal.path, self.journal.old_path):
+            try:
+                stat = os.stat(path)
+                stamp.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                stamp.append(None)
+
+        return tuple(stamp)
+
+    def catch_up(self):
+        """
+        Applies whatever other processes have stored since this one last looked, so cancels and fired reminders aren't
+        acted on twice and our own changes are numbered after theirs. Must be called while holding the condition and
+        the lock file
+        """
+        stamp = self.file_stamp()
+        if stamp == self.stamp: # Nobody else has stored anything
+            return
+
+        # A new snapshot or old journal means another process compacted, so our place in the journal no longer applies
+        records = self.journal.unread() if stamp[0] == self.stamp[0] and stamp[2] == self.stamp[2] else None
+
+        if records is None:
+            self.load()
+        else:
+            for record in records:
+                self.apply(record)
+                self.seq = max(self.seq, record["seq"])
+
+            self.stamp = stamp
+
+        self.condition.notify_all() # The next reminder due may have changed
+
+    def refresh(self):
+        """
+        Catches up on other processes' changes, only taking the lock file if something has changed
+        """
+        with self.condition:
+            if self.file_stamp() != self.stamp:
+                with self.lock_file:
+                    self.catch_up()
+
+    def apply(self, record: dict):
+        """
+        Applies a journal record to the in-memory queue. Must be called while holding the condition
+        """
+        if record["op"] == "batch":
+            for change in record["records"]:
+                self.apply(change)
+            return
+
+        key = record["key"]
+        self.unlink(key)
+
+        if record["op"] == "schedule":
+            item = record.get("item")
+            self.reminders[key] = {"key": key, "title": record["title"], "message": record["message"], "due": record["due"],
+                                   "item": item, "item_date": record.get("item_date")}
+
+            if item is not None:
+                self.by_item.setdefault(item, set()).add(key)
+
+            self.order += 1
+            self.orders[key] = self.order # Any older entry for the same key is now skipped when it reaches the top
+            heapq.heappush(self.heap, (datetime.fromisoformat(record["due"]).timestamp(), self.order, key))
+        else: # Cancelled or fired; its heap entry is skipped lazily
+            self.reminders.pop(key, None)
+            self.orders.pop(key, None)
+
+        if len(self.heap) > 2 * len(self.reminders) + 64: # Mostly dead entries, so the heap is rebuilt from what's left
+            self.heap = [entry for entry in self.heap if self.orders.get(entry[2]) == entry[1]]
+            heapq.heapify(self.heap)
+
+    def unlink(self, key: str):
+        """
+        Drops a reminder from the item index, ahead of it being replaced or removed
+        """
+        reminder = self.reminders.get(key)
+        if reminder is None or reminder["item"] is None:
+            return
+
+        keys = self.by_item[reminder["item"]]
+        keys.discard(key)
+
+        if not keys:
+            del self.by_item[reminder["item"]]
+
+    def commit(self, records: list):
+        """
+        Applies and journals records, then wakes the thread in case the next due time has changed. Several records
+        are journalled as one line, so they're kept or lost together
+        """
+        if records == []:
+            return
+
+        with self.condition, self.lock_file:
+            self.catch_up()
+
+            for record in records:
+                self.apply(record)
+
+            self.seq += 1
+            self.journal.append({**records[0], "seq": self.seq} if len(records) == 1 else {"op": "batch", "seq": self.seq, "records": records})
+            self.stamp = self.file_stamp()
+
+            if self.journal.needs_compaction() and self.journal.size >= self.snapshot_size:
+                self.compact()
+
+            self.condition.notify_all()
+
+    def schedule(self, key: str, title: str, message: str, due: datetime, item: str = None, item_date: str = None):
+        """
+        Queues a reminder, replacing any pending one with the same key. Reminders for an item carry its ID, so they
+        can be found, moved and cancelled along with it
+        """
+        self.commit([schedule_record(key, title, message, due, item, item_date)])
+
+    def cancel(self, key: str) -> bool:
+        """
+        Drops a pending reminder. Returns False if there was nothing to cancel
+        """
+        with self.condition, self.lock_file:
+            self.catch_up()
+
+            if key not in self.reminders:
+                return False
+
+            self.commit([{"op": "cancel", "key": key}])
+            return True
+
+    def for_item(self, item: str) -> list:
+        """
+        Returns the pending reminders for an item, soonest first
+        """
+        self.refresh()
+
+        with self.condition:
+            return sorted((self.reminders[key] for key in self.by_item.get(item, ())), key=lambda reminder: reminder["due"])
+
+    def cancel_items(self, items: list) -> int:
+        """
+        Cancels every reminder belonging to any of the items in one go, returning how many there were
+        """
+        with self.condition, self.lock_file:
+            self.catch_up()
+
+            records = [{"op": "cancel", "key": key} for item in items for key in self.by_item.get(item, ())]
+            self.commit(records)
+
+        return len(records)
+
+    def pending(self) -> list:
+        """
+        Returns every pending reminder, soonest first
+        """
+        self.refresh()
+
+        with self.condition:
+            return sorted(self.reminders.values(), key=lambda reminder: reminder["due"])
+
+    def next_due(self):
+        """
+        Returns the timestamp of the soonest live reminder, or None if the queue is empty
+        """
+        while self.heap and self.orders.get(self.heap[0][2]) != self.heap[0][1]:
+            heapq.heappop(self.heap) # Cancelled or moved since it was pushed
+
+        return self.heap[0][0] if self.heap else None
+
+    def fire_due(self, now: float = None) -> int:
+        """
+        Shows every reminder due at or before now, returning how many were shown
+        """
+        now = time.time() if now is None else now
+        due = []
+
+        with self.condition, self.lock_file:
+            self.catch_up() # So a reminder another process has fired (or cancelled) isn't shown again
+
+            while self.next_due() is not None and self.next_due() <= now:
+                due.append(self.reminders[heapq.heappop(self.heap)[2]])
+
+            if due != []:
+                self.commit([{"op": "fired", "key": reminder["key"]} for reminder in due])
+
+        for reminder in due: # Shown outside the lock, since backends can be slow
+            try:
+                self.backend.show(reminder["title"], reminder["message"])
+            except Exception as error: # One broken notification shouldn't stop the rest
+                print(f"Couldn't show notification {reminder['key']!r}: {error}", file=sys.stderr)
+
+        return len(due)
+
+    def compact(self):
+        """
+        Writes the pending queue out as a fresh snapshot and empties the journal. Must be called while holding the
+        condition and the lock file, after catching up
+        """
+        self.journal.rotate()
+
+        snapshot = codec.dumps({"seq": self.seq, "reminders": sorted(self.reminders.values(), key=lambda reminder: reminder["due"])})
+        write_atomic(self.path, snapshot, generations=0)
+
+        self.snapshot_size = len(snapshot)
+
+        self.journal.discard_old() # Safe even if we die first, since load skips records the snapshot already covers
+        self.stamp = self.file_stamp()
+
+    def start(self):
+        """
+        Starts firing reminders on a background thread
+        """
+        if self.thread is not None and self.thread.is_alive():
+            return
+
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self, max_sleep: float = 60, poll: float = 2):
+        """
+        Sleeps until the next reminder is due (or the queue changes), fires it, and repeats. Sleeps are capped at
+        max_sleep so a changed system clock or a suspended machine can't leave reminders waiting for long, and the
+        files are checked every poll seconds for reminders other processes have set
+        """
+        while self.running:
+            self.fire_due()
+
+            with self.condition:
+                if not self.running:
+                    break
+
+                due = self.next_due()
+                timeout = max_sleep if due is None else min(max_sleep, max(0, due - time.time()))
+
+                deadline = time.time() + timeout
+                while self.running and time.time() < deadline and self.file_stamp() == self.stamp:
+                    if self.condition.wait(min(poll, max(0, deadline - time.time()))):
+                        break # Woken by a change in this process
+
+    def stop(self):
+        """
+        Stops the background thread and closes the journal
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+        self.journal.close()
+        self.lock_file.close()
@@ -0,0 +1,180 @@
+"""
+studytime.recurrence
+
+Author: Jake Hickey
+Description: Rules for items that repeat, like weekly classes and fortnightly assignments. A rule is saved once and its
+occurrences are only worked out for the dates something asks about
+"""
+
+# Imports
+if __name__ == "__main__":
+    from items import *
+else:
+    from studytime.items import *
+
+from datetime import date, datetime, timedelta
+
+FREQUENCIES = {"daily": 1, "weekly": 7} # Days per step before the interval is applied
+
+def occurrence_id(rule_id: str, day: date) -> str:
+    """
+    The item ID of a rule's occurrence on a given day. An occurrence that gets edited keeps it as a saved item
+    """
+    return f"{rule_id}@{day.isoformat()}"
+
+def last_day(year: int, month: int) -> date:
+    """
+    The last date of a month, without stepping past the end of December 9999
+    """
+    if month == 12:
+        return date(year, 12, 31)
+
+    return date(year, month + 1, 1) - timedelta(days=1)
+
+def split_occurrence(item_id: str):
+    """
+    Returns (rule ID, date) for an occurrence's item ID, or None for any other item ID
+    """
+    rule_id, sep, day = item_id.partition("@")
+    if sep == "":
+        return None
+
+    try:
+        return rule_id, date.fromisoformat(day)
+    except ValueError:
+        return None
+
+class Rule:
+    """
+    Repeats an item every interval days or weeks from start until an optional end date (e.g. the end of term), on the
+    given weekdays (0 is Monday) for weekly rules. Dates listed in exceptions are skipped
+    """
+    def __init__(self, item: dict, start: date, frequency: str = "weekly", interval: int = 1, until: date = None,
+                 weekdays: list = None, exceptions: list = None, id: str = None):
+        if frequency not in FREQUENCIES:
+            raise ValueError(f"unknown frequency {frequency!r}")
+
+        if interval < 1:
+            raise ValueError("interval must be at least 1")
+
+        self.id = id or new_id()
+        self.item = {field: value for field, value in item.items() if field != "id"} # Save file form of the item, without an ID
+        self.start = start
+        self.frequency = frequency
+        self.interval = interval
+        self.until = until
+        self.weekdays = sorted(set(weekdays)) if weekdays else [start.weekday()]
+        self.exceptions = set(exceptions or ()) # "YYYY-MM-DD" of skipped occurrences
+
+        self.template = Item.from_dict({**self.item, "id": self.id}) # Stands in for every occurrence in the search index
+
+    @classmethod
+    def from_item(cls, item, start: datetime, **options):
+        """
+        Builds a rule repeating an existing (unsaved) item, starting from the given date and time
+        """
+        data = item.prepare_dict()
+        data["time"] = start.strftime("%H:%M:%S")
+
+        return cls(data, start.date() if isinstance(start, datetime) else start, **options)
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        until = data.get("until")
+
+        return cls(data["item"], date.fromisoformat(data["start"]), data["frequency"], data["interval"],
+                   date.fromisoformat(until) if until is not None else None, data["weekdays"], data.get("exceptions"), data["id"])
+
+    def prepare_dict(self) -> dict:
+        """
+        Returns a dictionary for the purpose of storing within the save file
+        """
+        data = {
+            "id": self.id,
+            "item": self.item,
+            "start": self.start.isoformat(),
+            "frequency": self.frequency,
+            "interval": self.interval,
+            "weekdays": self.weekdays
+        }
+
+        if self.until is not None:
+            data["until"] = self.until.isoformat()
+
+        if self.exceptions:
+            data["exceptions"] = sorted(self.exceptions)
+
+        return data
+
+    def occurrences(self, first: date, last: date):
+        """
+        Yields each date the rule falls on from first to last inclusive, in order, without stepping through the
+        dates before first
+        """
+        first = max(first, self.start)
+        if self.until is not None:
+            last = min(last, self.until)
+
+        if first > last:
+            return
+
+        step = FREQUENCIES[self.frequency] * self.interval
+
+        if self.frequency == "daily":
+            anchor = self.start
+            days = [0]
+        else: # Weeks are counted from the Monday of the week the rule starts in
+            anchor = self.start - timedelta(days=self.start.weekday())
+            days = self.weekdays
+
+        # Jumps straight to the last period starting on or before first
+        period = anchor + timedelta(days=(first - anchor).days // step * step)
+
+        while period <= last:
+            for offset in days:
+                if offset > (last - period).days: # Also keeps clear of the end of December 9999
+                    break
+
+                day = period + timedelta(days=offset)
+
+                if first <= day and day.isoformat() not in self.exceptions:
+                    yield day
+
+            if (last - period).days < step:
+                break
+
+            period += timedelta(days=step)
+
+    def falls_on(self, day: date) -> bool:
+        return next(self.occurrences(day, day), None) is not None
+
+    def make_item(self, day: date):
+        """
+        Builds the item for one occurrence
+        """
+        data = {**self.item, "id": occurrence_id(self.id, day)}
+
+        if data["type"] != "Event" and "completed" not in data:
+            data["completed"] = "False"
+
+        return Item.from_dict(data)
+
+    def covers(self, year: int, month: int) -> bool:
+        """
+        Checks whether any of the month could hold an occurrence
+        """
+        return self.start <= last_day(year, month) and (self.until is None or self.until >= date(year, month, 1))
+
+    def months(self, first: date, last: date):
+        """
+        Yields (year, month) for each month from first to last that the rule could fall in, so a rule that stopped
+        (or hasn't started) isn't expanded for every month of a long range
+        """
+        first = max(first, self.start)
+        if self.until is not None:
+            last = min(last, self.until)
+
+        year, month = first.year, first.month
+        while (year, month) <= (last.year, last.month):
+            yield year, month
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
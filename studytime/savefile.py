@@ -0,0 +1,198 @@
+"""
+studytime.savefile
+
+Author: Jake Hickey
+Description: Reading and writing the chunked save file layout, where each year can be loaded on its own
+"""
+
+# Imports
+if __name__ == "__main__":
+    import codec
+else:
+    from studytime import codec
+
+import mmap, os, shutil, zlib
+
+SAVE_VERSION = 3 # Header line with a year offset table (and any recurrence rules), followed by one JSON object per year
+GENERATIONS = 3 # Previous save files kept as <name>.json.1 (newest) to <name>.json.N
+
+class DamagedFile(ValueError):
+    """
+    Raised when part of a save file doesn't match what its header says, i.e. it was damaged after being written
+    """
+
+class FileChanged(Exception):
+    """
+    Raised when a save file has been swapped for another one since its header was read, so its offsets no longer apply
+    """
+
+def file_identity(stat: os.stat_result) -> tuple:
+    """
+    Tells save files apart. Every write swaps in a new file rather than changing one in place, so a file with the same
+    identity always has the same contents
+    """
+    return stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+def read_header(path: str):
+    """
+    Reads just the header line of a save file through a memory map, so the rest of the file is never touched. Returns
+    None if the file is in one of the older whole-file JSON layouts, and raises DamagedFile if it has been cut short
+    """
+    with open(path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        size = stat.st_size
+        if size == 0:
+            return None
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = mm.find(b"\n")
+            line = mm[:end] if end != -1 else mm[:]
+
+    try:
+        header = codec.loads(line)
+    except codec.DecodeError: # Indented older saves don't parse from their first line alone
+        return None
+
+    if not isinstance(header, dict) or header.get("version", 0) < SAVE_VERSION:
+        return None
+
+    header["body"] = end + 1 # Year offsets are relative to the end of the header line
+    header["identity"] = file_identity(stat) # Of the file this header came from, see read_chunks
+    header["years"] = {int(year): tuple(span) for year, span in header["years"].items()}
+    header["sums"] = {int(year): checksum for year, checksum in header.get("sums", {}).items()} # Missing from early version 3 saves
+    header.setdefault("rules", [])
+
+    if size != header["body"] + sum(length for offset, length in header["years"].values()):
+        raise DamagedFile(f"{path} doesn't match its year offset table")
+
+    return header
+
+def read_chunks(path: str, body: int, spans: dict, identity: tuple = None) -> dict:
+    """
+    Returns the raw bytes of each requested year, given {year: (offset, length)}. If identity is given, raises
+    FileChanged instead when path is no longer the file those offsets were read from
+    """
+    if spans == {}:
+        return {}
+
+    with open(path, "rb") as f:
+        if identity is not None and file_identity(os.fstat(f.fileno())) != identity:
+            raise FileChanged(f"{path} has been replaced since its header was read")
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return {year: mm[body + offset:body + offset + length] for year, (offset, length) in spans.items()}
+
+def read_year(path: str, body: int, span: tuple, build=None, identity: tuple = None, checksum: int = None) -> dict:
+    """
+    Parses a single year's {"YYYY-MM-DD": [items]} object out of the save file, passing each item dictionary through
+    build if given. Raises DamagedFile if the year doesn't match its checksum or doesn't parse
+    """
+    chunk = read_chunks(path, body, {0: span}, identity)[0]
+
+    if checksum is not None and zlib.crc32(chunk) != checksum:
+        raise DamagedFile(f"{path} has a damaged year at offset {span[0]}")
+
+    try:
+        return codec.loads_dates(chunk, build) if build is not None else codec.loads(chunk)
+    except codec.DecodeError + (KeyError, TypeError) as error: # Damage the checksum can't catch, in saves without one
+        raise DamagedFile(f"{path} has a damaged year at offset {span[0]}") from error
+
+def verify_file(path: str) -> dict:
+    """
+    Reads a save file's header and checks every year against it, so a damaged file is never restored from. Returns
+    the header, or None for the older layouts
+    """
+    header = read_header(path)
+
+    if header is not None:
+        for year, span in header["years"].items():
+            read_year(path, header["body"], span, checksum=header["sums"].get(year))
+
+    return header
+
+def encode_year(dates: dict) -> bytes:
+    """
+    Encodes one year's dates as a chunk, leaving out any dates that have no items
+    """
+    return codec.dumps({key: items for key, items in sorted(dates.items()) if items != []})
+
+def build_file(seq: int, chunks: dict, rules: list = None, sums: dict = None) -> tuple:
+    """
+    Lays out a full save file from {year: chunk bytes} and the save's recurrence rules, which are small enough to
+    live in the header. Each year gets a CRC32 for read_year to check, unless it is already in sums (chunks copied
+    from an older file keep theirs, so damage in them isn't covered up). Returns the file contents along with its
+    parsed header
+    """
+    sums = sums or {}
+
+    years, checksums, offset = {}, {}, 0
+    for year in sorted(chunks):
+        years[year] = (offset, len(chunks[year]))
+        checksums[year] = sums[year] if year in sums else zlib.crc32(chunks[year])
+        offset += len(chunks[year])
+
+    fields = {"version": SAVE_VERSION, "seq": seq, "years": years, "sums": checksums}
+    if rules: # Left out entirely for saves without any, so their headers stay as they were
+        fields["rules"] = rules
+
+    header = codec.dumps(fields) + b"\n"
+    content = header + b"".join(chunks[year] for year in sorted(chunks))
+
+    return content, {**fields, "rules": rules or [], "body": len(header)}
+
+def write_temp(temp_path: str, content: bytes):
+    """
+    Writes content to a temporary file and makes sure it has reached the disk before anything is renamed over
+    """
+    with open(temp_path, "wb") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+
+def swap_in(temp_path: str, path: str, generations: int = GENERATIONS):
+    """
+    Renames a fully written temporary file over path, first keeping the current file as the newest generation
+    """
+    if generations > 0 and os.path.exists(path):
+        for idx in range(generations, 1, -1): # Shuffles each generation one older, dropping the oldest
+            if os.path.exists(f"{path}.{idx - 1}"):
+                os.replace(f"{path}.{idx - 1}", f"{path}.{idx}")
+
+        if os.path.exists(f"{path}.1"):
+            os.remove(f"{path}.1")
+
+        try:
+            os.link(path, f"{path}.1") # Path keeps pointing at the current file until the rename below
+        except OSError: # Filesystems without hard links
+            shutil.copyfile(path, f"{path}.1")
+
+    os.replace(temp_path, path)
+    sync_directory(path)
+
+def sync_directory(path: str):
+    """
+    Flushes the directory entry of path, so the rename itself survives a power cut
+    """
+    if os.name != "posix": # Windows can't open directories, and NTFS journals renames itself
+        return
+
+    handle = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(handle)
+    finally:
+        os.close(handle)
+
+def write_atomic(path: str, content: bytes, temp_path: str = None, generations: int = GENERATIONS):
+    """
+    Replaces path with content so that readers, and anything left after a crash, only ever see the old file or the new one
+    """
+    temp_path = temp_path or f"{path}.tmp"
+
+    write_temp(temp_path, content)
+    swap_in(temp_path, path, generations)
+
+def saved_generations(path: str, generations: int = GENERATIONS) -> list:
+    """
+    Returns the paths of the kept generations that exist, newest first
+    """
+    return [f"{path}.{idx}" for idx in range(1, generations + 1) if os.path.exists(f"{path}.{idx}")]
@@ -0,0 +1,160 @@
+"""
+studytime.search
+
+Author: Jake Hickey
+Description: A trigram inverted index over item names and subjects, used for the search bar
+"""
+
+# Imports
+import heapq, math, re
+
+WORD = re.compile(r"[a-z0-9]+")
+
+def trigrams(text: str, prefix: bool = False) -> set:
+    """
+    Splits text into words and returns the padded trigrams of each. With prefix set, the final word isn't padded on
+    the end, so a half-typed word still matches everything that starts with it
+    """
+    words = WORD.findall(text.lower())
+    grams = set()
+
+    for idx, word in enumerate(words):
+        padded = f"  {word}" if prefix and idx == len(words) - 1 else f"  {word} "
+        grams.update(padded[pos:pos + 3] for pos in range(len(padded) - 2))
+
+    return grams
+
+class SearchIndex:
+    """
+    Maps trigrams to the distinct names and subjects that contain them. Items that share a name share one entry, so
+    the index grows with the number of different names rather than the number of items
+    """
+    def __init__(self):
+        self.postings = {} # Trigram -> set of lowercased names/subjects containing it
+        self.sizes = {} # Lowercased name/subject -> [trigram count, number of fields using it]
+
+        self.fields = {"name": {}, "subject": {}} # Item attribute -> lowercased text -> {id(item): (item, date key)}
+        self.weights = {"name": 1.0, "subject": 0.5} # Subject matches rank below name matches
+
+    def add(self, item, key: tuple):
+        """
+        Indexes an item under its name and subject
+        """
+        for field, table in self.fields.items():
+            text = f"{getattr(item, field)}".lower()
+            if text == "none": # Events, and items saved without a subject
+                continue
+
+            if text not in table:
+                table[text] = {}
+                self.index_text(text)
+
+            table[text][id(item)] = (item, key)
+
+    def remove(self, item):
+        """
+        Drops an item from the index, forgetting its name and subject once nothing else uses them
+        """
+        for field, table in self.fields.items():
+            text = f"{getattr(item, field)}".lower()
+            entries = table.get(text)
+            if entries is None:
+                continue
+
+            entries.pop(id(item), None)
+
+            if entries == {}:
+                del table[text]
+                self.unindex_text(text)
+
+    def names(self) -> list:
+        """
+        Returns every distinct item name, keeping its original capitalisation
+        """
+        names = []
+        for entries in self.fields["name"].values():
+            names.extend({item.name for item, key in entries.values()})
+
+        return names
+
+    def has_name(self, name: str) -> bool:
+        """
+        Checks whether any indexed item has exactly this name
+        """
+        entries = self.fields["name"].get(name.lower(), {})
+
+        return any(item.name == name for item, key in entries.values())
+
+    def index_text(self, text: str):
+        if text in self.sizes: # Already indexed through the other field
+            self.sizes[text][1] += 1
+            return
+
+        grams = trigrams(text)
+        self.sizes[text] = [len(grams), 1] # Trigram count, and how many fields are using the text
+
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(text)
+
+    def unindex_text(self, text: str):
+        self.sizes[text][1] -= 1
+        if self.sizes[text][1] > 0:
+            return
+
+        del self.sizes[text]
+
+        for gram in trigrams(text):
+            self.postings[gram].discard(text)
+            if not self.postings[gram]:
+                del self.postings[gram]
+
+    def search(self, query: str, limit: int = 10, cutoff: float = 0.5) -> list:
+        """
+        Returns up to limit (item, date key) pairs, best match first. The last word of the query is treated as a prefix,
+        and texts sharing at least cutoff of the query's trigrams are kept, so small typos still match
+        """
+        query = query.lower().strip()
+        grams = trigrams(query, prefix=True)
+        if not grams:
+            return []
+
+        # Any text sharing enough trigrams must appear in one of the rarest lists, so only those are used to find candidates
+        need = max(1, math.ceil(len(grams) * cutoff))
+        lists = sorted((self.postings.get(gram, set()) for gram in grams), key=len)
+
+        candidates = set().union(*lists[:len(lists) - need + 1])
+
+        scored = []
+        for text in candidates:
+            hits = sum(text in posting for posting in lists)
+            if hits < need:
+                continue
+
+            score = 2 * hits / (len(grams) + self.sizes[text][0]) # Dice coefficient over trigrams
+
+            if text == query:
+                score += 1
+            elif text.startswith(query):
+                score += 0.75
+            elif f" {query}" in f" {text}": # Query starts at the beginning of a later word
+                score += 0.5
+            elif query in text:
+                score += 0.25
+
+            for field, table in self.fields.items():
+                if text in table:
+                    scored.append((score * self.weights[field], text, field))
+
+        results, seen = [], set()
+        for score, text, field in heapq.nlargest(limit * 2, scored): # An item can match by name and subject, so twice as many texts always covers limit items
+            for item, key in self.fields[field][text].values():
+                if id(item) in seen:
+                    continue
+
+                seen.add(id(item))
+                results.append((item, key))
+
+                if len(results) == limit:
+                    return results
+
+        return results
@@ -0,0 +1,685 @@
+"""
+studytime.storage
+
+Author: Jake Hickey
+Description: Storage backends for SaveInstance. Each one persists change records and hands back a year of items at a time
+"""
+
+# Imports
+if __name__ == "__main__":
+    from items import Item
+    from journal import Journal
+    from lockfile import LockFile
+    from savefile import *
+    import codec
+else:
+    from studytime.items import Item
+    from studytime.journal import Journal
+    from studytime.lockfile import LockFile
+    from studytime.savefile import *
+    from studytime import codec
+
+import os, shutil, threading
+
+class Storage:
+    """
+    Interface shared by every backend. SaveInstance keeps loaded years in memory, and only comes here to read a year
+    it hasn't seen yet, or to persist a change it has already applied
+    """
+    def __init__(self, save, directory: str, file_name: str):
+        self.save = save # Owning SaveInstance, whose lock guards everything in here too
+        self.directory = directory
+        self.file_name = file_name
+
+    def open(self) -> tuple:
+        """
+        Opens (or creates) the save. Returns the sequence number it holds, and any journalled records newer than that
+        """
+        raise NotImplementedError
+
+    def years(self) -> set:
+        """
+        Returns every year that holds items
+        """
+        raise NotImplementedError
+
+    def rules(self) -> list:
+        """
+        Returns the save file form of every recurrence rule saved
+        """
+        return []
+
+    def read_year(self, year: int) -> dict:
+        """
+        Returns {"YYYY-MM-DD": [Item]} for one year
+        """
+        raise NotImplementedError
+
+    def persist(self, record: dict):
+        """
+        Stores a change record that SaveInstance has just applied. Called while holding the lock
+        """
+        raise NotImplementedError
+
+    def persist_batch(self, records: list):
+        """
+        Stores several change records so that either all of them or none of them survive a crash
+        """
+        raise NotImplementedError
+
+    def write(self):
+        """
+        Stores everything SaveInstance currently holds in one go
+        """
+        raise NotImplementedError
+
+    def stale(self) -> bool:
+        """
+        Checks whether years that haven't been read yet can no longer be read consistently with the ones that have
+        """
+        return False
+
+    def changed(self) -> bool:
+        """
+        Checks whether another process has changed the save since this backend last read or wrote it
+        """
+        return False
+
+    def search(self, query: str, limit: int):
+        """
+        Backends with their own text index return up to limit (item, date key) pairs. None means SaveInstance should
+        fall back to its in-memory index
+        """
+        return None
+
+    def close(self):
+        pass
+
+class JsonStorage(Storage):
+    """
+    The chunked JSON save file from studytime.savefile, with changes appended to a journal in between snapshots
+    """
+    def __init__(self, save, directory: str, file_name: str, journal: bool = True, generations: int = GENERATIONS):
+        super().__init__(save, directory, file_name)
+
+        self.file_path = f"{directory}/{file_name}.json"
+        self.generations = generations # Number of previous save files kept to recover from
+        self.journal = Journal(f"{directory}/{file_name}.journal") if journal else None
+        self.lock_file = LockFile(f"{directory}/{file_name}.lock") # Taken after the save's lock, never before it
+        self.compactor = None
+
+        self.offsets, self.body = {}, 0 # Year -> (offset, length) within the body of the current file
+        self.sums = {} # Year -> CRC32 of its chunk, for the years the current file has one for
+        self.saved_rules = [] # Recurrence rules from the header of the current file
+        self.identity = None # Which file the offsets belong to, see savefile.file_identity
+        self.opened = 0 # Times open has run, since what SaveInstance holds is relative to the file read that time
+        self.stamp = None
+
+    def open(self) -> tuple:
+        """
+        Reads the year offset table, creating the file or migrating an older layout first if needed
+        """
+        with self.lock_file: # So no other process is part way through appending to the journal or replacing the file
+            self.opened += 1
+
+            if self.journal is not None:
+                self.journal.reset()
+
+            try:
+                header = read_header(self.file_path)
+
+                if header is None: # One-time migration from the older layouts, keeping the original alongside
+                    header = self.migrate()
+            except FileNotFoundError:
+                header = self.new_file()
+            except ValueError: # Damaged outside of our own writes, e.g. by a crash in an older version or a bad copy
+                header = self.recover()
+                if header is None:
+                    raise
+
+            self.offsets, self.body, self.sums = header["years"], header["body"], header["sums"]
+            self.saved_rules = header["rules"]
+            self.identity = header.get("identity") or file_identity(os.stat(self.file_path)) # Freshly written ones are ours
+
+            records = list(self.journal.records(header["seq"])) if self.journal is not None else []
+            self.stamp = self.file_stamp()
+
+        return header["seq"], records
+
+    def new_file(self) -> dict:
+        """
+        Generates a new file
+        """
+        content, header = build_file(0, {})
+
+        write_atomic(self.file_path, content) # Outputs an empty save to a new file
+
+        return header
+
+    def recover(self):
+        """
+        Puts back the newest kept generation that reads cleanly, moving the damaged file aside to <name>.json.corrupt.
+        Returns its header, or None if there is nothing to recover from
+        """
+        for path in saved_generations(self.file_path, self.generations):
+            try:
+                header = verify_file(path)
+            except (OSError, ValueError):
+                continue
+
+            if header is None:
+                continue
+
+            with open(path, "rb") as f:
+                content = f.read()
+
+            if os.path.exists(f"{self.file_path}.corrupt"):
+                os.remove(f"{self.file_path}.corrupt")
+
+            try: # Copied aside rather than moved, so other processes never find the save missing
+                os.link(self.file_path, f"{self.file_path}.corrupt")
+            except OSError: # Filesystems without hard links
+                shutil.copyfile(self.file_path, f"{self.file_path}.corrupt")
+
+            write_atomic(self.file_path, content, generations=0) # The generations themselves are left as they were
+
+            return read_header(self.file_path) # Re-read so the header describes the restored file, not the generation
+
+        return None
+
+    def migrate(self) -> dict:
+        """
+        Rewrites a whole-file JSON save from before version 3 in the chunked layout
+        """
+        with open(self.file_path, "rb") as f:
+            dates, seq = read_snapshot(codec.loads(f.read()))
+
+        years = {}
+        for key, items in dates.items():
+            years.setdefault(int(key[:4]), {})[key] = items
+
+        content, header = build_file(seq, {year: encode_year(year_dates) for year, year_dates in years.items()})
+
+        try: # The original stays in place until the new file has been swapped in over it
+            if os.path.exists(f"{self.file_path}.bak"):
+                os.remove(f"{self.file_path}.bak")
+            os.link(self.file_path, f"{self.file_path}.bak")
+        except OSError: # Filesystems without hard links
+            shutil.copyfile(self.file_path, f"{self.file_path}.bak")
+
+        write_atomic(self.file_path, content, generations=0) # An older layout isn't worth keeping as a generation
+
+        return header
+
+    def years(self) -> set:
+        return set(self.offsets)
+
+    def rules(self) -> list:
+        return self.saved_rules
+
+    def read_year(self, year: int) -> dict:
+        if year not in self.offsets:
+            return {}
+
+        # Raises FileChanged if the file was rewritten after the last stale check, rather than misreading the new one
+        try:
+            return read_year(self.file_path, self.body, self.offsets[year], Item.from_dict, self.identity, self.sums.get(year))
+        except DamagedFile:
+            with self.lock_file:
+                if self.stale(): # Another process got to it first
+                    raise FileChanged(f"{self.file_path} has been replaced since its header was read")
+
+                if self.recover() is None:
+                    raise
+
+            # Offsets from the damaged file are no use now, so the save has to be reloaded from the restored one
+            raise FileChanged(f"{self.file_path} was damaged and has been restored from a kept generation")
+
+    def stale(self) -> bool:
+        """
+        Checks whether something else has rewritten the save file, which would make the year offsets wrong
+        """
+        return file_identity(os.stat(self.file_path)) != self.identity
+
+    def persist(self, record: dict):
+        with self.lock_file:
+            self.catch_up([record])
+            self.append(record)
+
+    def persist_batch(self, records: list):
+        """
+        Journals the whole batch as one line, so a torn write loses all of it rather than part of it
+        """
+        with self.lock_file:
+            self.catch_up(records)
+            self.append({"op": "batch", "seq": records[-1]["seq"], "records": records})
+
+    def append(self, record: dict):
+        """
+        Adds a record to the journal, or writes a snapshot without one. Must be called while holding the lock file
+        """
+        if self.journal is None:
+            self.write() # Snapshots are swapped in whole anyway
+            return
+
+        self.journal.append(record)
+        self.stamp = self.file_stamp()
+
+        if self.journal.needs_compaction():
+            self.compact()
+
+    def catch_up(self, unsaved: list = ()):
+        """
+        Brings the save up to date with whatever other processes have stored since this one last looked, so nothing
+        of theirs is overwritten and unsaved (our changes about to be stored) are numbered after theirs. Must be called
+        while holding the lock file
+        """
+        stamp = self.file_stamp()
+        if stamp == self.stamp: # Nobody else has stored anything
+            return
+
+        if self.stale() or self.journal is None or stamp[2] != self.stamp[2]:
+            records = None # Replaced or compacted, so our offsets and place in the journal no longer apply
+        else:
+            records = self.journal.unread() # Only appended to, so just the new records are needed
+
+        if records != []:
+            self.save.catch_up(records, list(unsaved))
+
+        self.stamp = self.file_stamp()
+
+    def prepare(self) -> tuple:
+        """
+        Lays out the full save file. Loaded years are re-encoded, while years that were never loaded are copied
+        across as raw bytes without being parsed. Must be called while holding the lock
+        """
+        save = self.save
+
+        for year in list(save.pending): # Journalled changes have to be folded in before the journal can go
+            save.load_year(year)
+
+        years = {}
+        for key, items in save.data.items():
+            years.setdefault(int(key[:4]), {})[key] = [item.prepare_dict() for item in items]
+
+        chunks = {year: encode_year(dates) for year, dates in years.items()}
+        chunks = {year: chunk for year, chunk in chunks.items() if chunk != b"{}"}
+
+        unloaded = {year: span for year, span in self.offsets.items() if year not in save.loaded}
+        chunks.update(read_chunks(self.file_path, self.body, unloaded, self.identity))
+        sums = {year: self.sums[year] for year in unloaded if year in self.sums} # Copied bytes keep their checksum
+
+        return build_file(save.seq, chunks, [rule.prepare_dict() for rule in save.rules.values()], sums)
+
+    def write_file(self, content: bytes, temp_path: str):
+        """
+        Writes to a temporary file, then swaps it in so the save file is never half-written
+        """
+        write_atomic(self.file_path, content, temp_path, self.generations)
+
+    def use_header(self, header: dict):
+        """
+        Switches over to the offsets of a save file this backend has just written
+        """
+        self.offsets, self.body, self.sums = header["years"], header["body"], header["sums"]
+        self.saved_rules = header["rules"]
+        self.identity = file_identity(os.stat(self.file_path))
+        self.stamp = self.file_stamp()
+
+    def write(self):
+        with self.save.lock, self.lock_file:
+            self.catch_up()
+            content, header = self.prepare()
+
+            self.write_file(content, f"{self.file_path}.tmp")
+            self.use_header(header)
+
+    def compact(self, wait: bool = False):
+        """
+        Folds the journal back into a fresh snapshot on a background thread
+        """
+        if self.compactor is not None and self.compactor.is_alive():
+            return
+
+        self.compactor = threading.Thread(target=self.run_compaction, daemon=True)
+        self.compactor.start()
+
+        if wait:
+            self.compactor.join()
+
+    def run_compaction(self):
+        """
+        Serialises the current data under the lock, then writes it out without blocking further changes
+        """
+        with self.save.lock, self.lock_file:
+            if self.save.writer is not None: # So the only changes in memory and not yet stored are other processes'
+                self.save.writer.write()
+
+            self.catch_up()
+            content, header = self.prepare() # Everything up to the current seq is captured here...
+            self.journal.rotate() # ...and every change from here on lands in a fresh journal
+
+            self.stamp = self.file_stamp()
+            snapshotted, rotated = self.identity, self.stamp[2] # The old journal holds nothing the snapshot doesn't
+            opened = self.opened
+
+        # Kept apart from write's temp file in case save_changes runs meanwhile, and from other processes' compactions
+        temp_path = f"{self.file_path}.{os.getpid()}.compact"
+
+        write_temp(temp_path, content) # The slow part, including the fsync, happens outside the lock
+
+        with self.save.lock, self.lock_file:
+            # Either someone wrote a newer snapshot meanwhile, or the save was reopened and its queued journal records
+            # would be applied again on top of a snapshot that already has them
+            if file_identity(os.stat(self.file_path)) != snapshotted or self.opened != opened:
+                os.remove(temp_path)
+                return
+
+            seen = self.stamp
+            swap_in(temp_path, self.file_path, self.generations)
+
+            if self.file_stamp()[2] == rotated: # Otherwise another process's compaction has merged newer records into it
+                self.journal.discard_old() # Safe even if we die first, since load_file skips records the snapshot already covers
+                seen = seen[:2] + (None,)
+
+            self.use_header(header)
+            self.stamp = self.stamp[:1] + seen[1:] # Anything other processes journalled meanwhile is still to be caught up on
+
+    def file_stamp(self) -> tuple:
+        """
+        Returns the modification time and size of every file backing this save, for spotting outside changes
+        """
+        paths = [self.file_path]
+        if self.journal is not None:
+            paths += [self.journal.path, self.journal.old_path]
+
+        stamp = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                stamp.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                stamp.append(None)
+
+        return tuple(stamp)
+
+    def changed(self) -> bool:
+        if self.compactor is not None and self.compactor.is_alive(): # Our own compaction is mid-way through changing the files
+            return False
+
+        return self.file_stamp() != self.stamp
+
+    def close(self):
+        """
+        Waits for any running compaction and closes the journal
+        """
+        if self.compactor is not None:
+            self.compactor.join()
+
+        if self.journal is not None:
+            self.journal.close()
+
+        self.lock_file.close()
+
+class SqliteStorage(Storage):
+    """
+    Keeps items as rows of an SQLite database, indexed by date, type, subject and completion. Every change is a single
+    row insert or delete, so nothing is ever rewritten wholesale
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS items (
+            id INTEGER PRIMARY KEY,
+            date TEXT NOT NULL,
+            time TEXT NOT NULL,
+            name TEXT NOT NULL,
+            subject TEXT,
+            type TEXT NOT NULL,
+            completed TEXT,
+            uid TEXT
+        );
+        CREATE INDEX IF NOT EXISTS items_date ON items (date, time);
+        CREATE INDEX IF NOT EXISTS items_type ON items (type, date);
+        CREATE INDEX IF NOT EXISTS items_subject ON items (subject, date);
+        CREATE INDEX IF NOT EXISTS items_completed ON items (completed, date);
+        CREATE TABLE IF NOT EXISTS rules (
+            id TEXT PRIMARY KEY,
+            rule TEXT NOT NULL
+        );
+    """
+
+    # Databases from before item IDs get the column added, before its index is made
+    UID_SCHEMA = """
+        CREATE INDEX IF NOT EXISTS items_uid ON items (uid);
+    """
+
+    # Trigram full-text index over names, kept in step with the items table by triggers
+    SEARCH_SCHEMA = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS items_search USING fts5(name, content='items', content_rowid='id', tokenize='trigram');
+        CREATE TRIGGER IF NOT EXISTS items_search_insert AFTER INSERT ON items BEGIN
+            INSERT INTO items_search (rowid, name) VALUES (new.id, new.name);
+        END;
+        CREATE TRIGGER IF NOT EXISTS items_search_delete AFTER DELETE ON items BEGIN
+            INSERT INTO items_search (items_search, rowid, name) VALUES ('delete', old.id, old.name);
+        END;
+    """
+
+    COLUMNS = "date, time, name, subject, type, completed, uid"
+
+    # Finds a row by item ID, or for rows from before IDs, the first with the item's date, name and time
+    MATCH = "SELECT id FROM items WHERE uid = ? UNION ALL SELECT id FROM items WHERE date = ? AND name = ? AND time = ? LIMIT 1"
+
+    def __init__(self, save, directory: str, file_name: str):
+        super().__init__(save, directory, file_name)
+
+        self.file_path = f"{directory}/{file_name}.db"
+        self.connection = None
+        self.searchable = False
+        self.version = None
+
+    def open(self) -> tuple:
+        if self.connection is None:
+            import sqlite3 # Only needed by this backend, so JSON saves don't pay for it at startup
+
+            self.connection = sqlite3.connect(self.file_path, check_same_thread=False) # Calls are serialised by the save's lock
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL") # WAL keeps this safe against crashes, just not power cuts
+            self.connection.executescript(self.SCHEMA)
+
+            if "uid" not in [column[1] for column in self.connection.execute("PRAGMA table_info(items)")]:
+                self.connection.execute("ALTER TABLE items ADD COLUMN uid TEXT")
+
+            self.connection.executescript(self.UID_SCHEMA)
+
+            try:
+                indexed = self.connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'items_search'").fetchone() is not None
+                self.connection.executescript(self.SEARCH_SCHEMA)
+                self.searchable = True
+
+                if not indexed: # Rows from before the search table existed have to be indexed, or deleting them breaks it
+                    self.connection.execute("INSERT INTO items_search (items_search) VALUES ('rebuild')")
+            except sqlite3.OperationalError: # SQLite builds without FTS5 trigram support fall back to the in-memory index
+                self.searchable = False
+
+            self.connection.commit()
+
+        self.version = self.data_version()
+
+        return 0, [] # Every change is committed straight into the database, so there is never anything to replay
+
+    def years(self) -> set:
+        """
+        Finds each year by jumping along the date index, so it costs one lookup per year rather than one per item
+        """
+        years = set()
+        row = self.connection.execute("SELECT MIN(date) FROM items").fetchone()
+
+        while row[0] is not None:
+            year = int(row[0][:4])
+            years.add(year)
+
+            row = self.connection.execute("SELECT MIN(date) FROM items WHERE date >= ?", (f"{str(year + 1).rjust(4, '0')}-01-01",)).fetchone()
+
+        return years
+
+    def rules(self) -> list:
+        return [codec.loads(row[0]) for row in self.connection.execute("SELECT rule FROM rules ORDER BY id")]
+
+    def read_year(self, year: int) -> dict:
+        start, end = f"{str(year).rjust(4, '0')}-01-01", f"{str(year + 1).rjust(4, '0')}-01-01"
+        dates = {}
+
+        for row in self.connection.execute(f"SELECT {self.COLUMNS} FROM items WHERE date >= ? AND date < ? ORDER BY date, time, id", (start, end)):
+            dates.setdefault(row[0], []).append(row_to_item(row))
+
+        return dates
+
+    def persist(self, record: dict):
+        self.persist_batch([record])
+
+    def persist_batch(self, records: list):
+        """
+        Runs every record's statement inside one transaction
+        """
+        with self.connection: # Commits at the end, or rolls everything back if a statement fails
+            for record in records:
+                if record["op"] == "rule": # Rules are stored whole, as their save file JSON
+                    self.connection.execute("INSERT OR REPLACE INTO rules (id, rule) VALUES (?, ?)",
+                                            (record["rule"]["id"], codec.dumps(record["rule"]).decode()))
+                    continue
+
+                if record["op"] == "unrule":
+                    self.connection.execute("DELETE FROM rules WHERE id = ?", (record["id"],))
+                    continue
+
+                if record["op"] != "add": # Edits are a delete and an insert, which keeps the search triggers simple
+                    self.connection.execute(f"DELETE FROM items WHERE id = ({self.MATCH})",
+                                            (record.get("id"), record["date"], record["name"], record["time"]))
+
+                if record["op"] == "add":
+                    self.connection.execute(f"INSERT INTO items ({self.COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)", item_to_row(record["date"], record["item"]))
+                elif record["op"] == "edit":
+                    self.connection.execute(f"INSERT INTO items ({self.COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                            item_to_row(record["to"], {**record["item"], "id": record["id"]}))
+
+        self.version = self.data_version()
+
+    def insert_many(self, dates: dict):
+        """
+        Bulk inserts {"YYYY-MM-DD": [Item]} in a single transaction, for importing
+        """
+        rows = (item_to_row(key, item.prepare_dict()) for key, items in dates.items() for item in items)
+
+        with self.connection:
+            self.connection.executemany(f"INSERT INTO items ({self.COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+        self.version = self.data_version()
+
+    def write(self):
+        """
+        Every change is already in the database, so this just makes sure it has reached the main file
+        """
+        self.connection.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def data_version(self) -> int:
+        return self.connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def changed(self) -> bool:
+        """
+        SQLite bumps data_version whenever another connection commits, so this never touches the items themselves
+        """
+        return self.data_version() != self.version
+
+    def search(self, query: str, limit: int):
+        """
+        Substring search through the trigram index, plus the recurring items (which aren't rows). Queries too short
+        for trigrams, or with no exact hits, fall back to SaveInstance's fuzzy in-memory index
+        """
+        if not self.searchable or len(query.strip()) < 3:
+            return None
+
+        phrase = '"' + query.strip().replace('"', '""') + '"'
+        rows = self.connection.execute(f"SELECT {', '.join('items.' + column for column in self.COLUMNS.split(', '))} FROM items_search "
+                                       "JOIN items ON items.id = items_search.rowid WHERE items_search MATCH ? LIMIT ?",
+                                       (phrase, limit * 5)).fetchall() # bm25 ranking scores every hit, so a handful are ranked here instead
+
+        query = query.strip().lower()
+        matches = [(row_to_item(row), tuple(int(part) for part in row[0].split("-"))) for row in rows]
+
+        # Rules are few and already in memory, so their items are matched the same way here, under their first date
+        matches += [(rule.template, (rule.start.year, rule.start.month, rule.start.day)) for rule in self.save.rules.values()
+                    if query in rule.template.name.lower()]
+
+        if matches == []:
+            return None
+
+        matches.sort(key=lambda match: (match[0].name.lower() != query, not match[0].name.lower().startswith(query), len(match[0].name)))
+
+        return matches[:limit]
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+BACKENDS = {"json": JsonStorage, "sqlite": SqliteStorage}
+
+def item_to_row(date: str, item: dict) -> tuple:
+    return (date, item["time"], item["name"], item.get("subject"), item["type"], item.get("completed"), item.get("id"))
+
+def row_to_item(row: tuple) -> Item:
+    """
+    Rebuilds an item from a database row, leaving out the fields its type doesn't have
+    """
+    date, time, name, subject, type, completed, uid = row
+    item = {"id": uid, "name": name, "time": time, "type": type}
+
+    if subject is not None:
+        item["subject"] = subject
+
+    if completed is not None:
+        item["completed"] = completed
+
+    return Item.from_dict(item)
+
+def read_snapshot(snapshot) -> tuple:
+    """
+    Reads any of the older whole-file save layouts into the sparse {"YYYY-MM-DD": [items]} layout, returning it with
+    the sequence number of the last change it contains
+    """
+    if isinstance(snapshot, list): # Version 0 saves are just the dense list of years
+        snapshot = {"version": 0, "seq": 0, "years": snapshot}
+
+    if snapshot["version"] >= 2:
+        return snapshot["dates"], snapshot["seq"]
+
+    dates = {}
+    for year in snapshot["years"]: # Versions 0 and 1 store every day of every year, padding included
+        for idx, month in enumerate(year["months"]):
+            for date in month:
+                if date["data"] != []:
+                    dates[f"{year['year'].rjust(4, '0')}-{str(idx + 1).rjust(2, '0')}-{date['date']}"] = date["data"]
+
+    return dates, snapshot["seq"]
+
+def import_json_save(file_name: str, directory: str = "studytime/app_data", target: str = None):
+    """
+    Copies a JSON save into an SQLite database of the same name (or target), returning the number of items copied
+    """
+    if __name__ == "__main__":
+        from core import SaveInstance
+    else:
+        from studytime.core import SaveInstance
+
+    source = SaveInstance(file_name, directory)
+    source.load_all()
+
+    destination = SaveInstance(target or file_name, directory, backend="sqlite")
+    destination.storage.insert_many({key: items for key, items in source.data.items() if items != []})
+    destination.storage.persist_batch([{"op": "rule", "rule": rule.prepare_dict()} for rule in source.rules.values()])
+
+    count = sum(len(items) for items in source.data.values())
+
+    source.close()
+    destination.close()
+
+    return count
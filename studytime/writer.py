@@ -0,0 +1,91 @@
+"""
+studytime.writer
+
+Author: Jake Hickey
+Description: Write-behind persistence, so changes show up in memory straight away and reach the disk shortly after
+"""
+
+# Imports
+import threading, time
+
+class BackgroundWriter:
+    """
+    Collects change records that SaveInstance has already applied, and persists them together on a background thread
+    at most delay seconds after the first one arrived
+    """
+    def __init__(self, save, delay: float = 0.5):
+        self.save = save # Owning SaveInstance; its lock is always taken before self.condition
+        self.delay = delay
+
+        self.pending = [] # Records applied in memory but not yet handed to the storage backend
+        self.error = None # Last failure from the background thread, raised by the next flush
+        self.closed = False
+
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, records: list):
+        """
+        Queues records for the next write. Called while holding the save's lock, so records arrive in seq order
+        """
+        with self.condition:
+            self.pending.extend(records)
+            self.condition.notify_all()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.pending == [] and not self.closed:
+                    self.condition.wait()
+
+                if self.closed:
+                    return
+
+                deadline = time.monotonic() + self.delay # Anything else that turns up before this rides along
+                while not self.closed and time.monotonic() < deadline:
+                    self.condition.wait(deadline - time.monotonic())
+
+            self.write()
+
+    def write(self):
+        """
+        Persists everything pending as one batch. Records are only taken while holding the save's lock, so a flush
+        on another thread can never see them half-written
+        """
+        with self.save.lock:
+            with self.condition:
+                records, self.pending = self.pending, []
+
+            if records == []:
+                return
+
+            try:
+                self.save.storage.persist_batch(records)
+            except Exception as error: # Kept for the next attempt, and reported by flush
+                with self.condition:
+                    self.pending[:0] = records
+                    self.error = error
+
+    def flush(self):
+        """
+        Writes out anything pending on the calling thread, raising the error if the storage backend refused it
+        """
+        self.write()
+
+        with self.condition:
+            error, self.error = self.error, None
+
+        if error is not None:
+            raise error
+
+    def close(self):
+        """
+        Stops the background thread once everything pending has been written
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+        self.thread.join()
+        self.flush()
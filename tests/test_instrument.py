@@ -0,0 +1,53 @@
+"""
+tests/test_instrument
+
+Author: Jake Hickey
+Description: Regression tests for the GUI with its hot paths timed
+"""
+
+# Imports
+import sys, os, tempfile, unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from studytime import instrument
+
+try:
+    from PyQt6.QtCore import QDate
+    from PyQt6.QtWidgets import QApplication
+
+    import app
+except ImportError: # The GUI's requirements aren't installed
+    app = None
+
+@unittest.skipIf(app is None, "PyQt6 isn't installed")
+class TimedSlotTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+
+        os.makedirs(os.path.join(self.directory.name, "studytime", "app_data"))
+        os.chdir(self.directory.name) # The window opens its save from studytime/app_data
+
+        self.application = QApplication.instance() or QApplication([])
+
+        for target in instrument.TARGETS: # As instrument.enable("timing") would, without timing the rest of the tests
+            if target[0] in (app.MainWindow, app.StudyCalendar, app.DayModel):
+                instrument.wrap(*target)
+
+        self.window = app.MainWindow()
+
+    def tearDown(self):
+        self.window.data.close()
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+    def test_calendar_click_reaches_the_timed_slot(self):
+        self.window.date.clicked.emit(QDate(2024, 3, 5)) # clicked(QDate) into data_clicked(self)
+
+        self.assertGreaterEqual(instrument.STATS["MainWindow.data_clicked"]["calls"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+tests/test_journal
+
+Author: Jake Hickey
+Description: Regression tests for the change journal surviving a torn final line
+"""
+
+# Imports
+import sys, os, tempfile, unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from studytime.journal import Journal
+
+TORN = b'{"op":"add","seq":2,"da' # What a crash part way through writing a record leaves behind
+
+class TornLineTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "save.journal")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def seqs(self, journal: Journal) -> list:
+        return [record["seq"] for record in journal.records()]
+
+    def test_appends_after_torn_line_are_kept(self):
+        journal = Journal(self.path)
+        journal.append({"op": "add", "seq": 1})
+        journal.close()
+
+        with open(self.path, "ab") as f:
+            f.write(TORN)
+
+        journal = Journal(self.path) # As if the app was started again after the crash
+        journal.append({"op": "add", "seq": 2})
+        journal.append({"op": "add", "seq": 3})
+
+        self.assertEqual(self.seqs(journal), [1, 2, 3])
+        self.assertEqual(journal.size, os.path.getsize(self.path))
+        journal.close()
+
+    def test_appends_after_reset_are_kept(self):
+        journal = Journal(self.path)
+        journal.append({"op": "add", "seq": 1})
+
+        with open(self.path, "ab") as f:
+            f.write(TORN)
+
+        journal.reset()
+        journal.append({"op": "add", "seq": 2})
+
+        self.assertEqual(self.seqs(journal), [1, 2])
+        journal.close()
+
+    def test_rotate_onto_torn_old_journal(self):
+        with open(f"{self.path}.old", "wb") as f: # Left behind by a compaction that crashed
+            f.write(b'{"op":"add","seq":1}\n' + TORN)
+
+        journal = Journal(self.path)
+        journal.append({"op": "add", "seq": 2})
+        journal.rotate()
+        journal.append({"op": "add", "seq": 3})
+
+        self.assertEqual(self.seqs(journal), [1, 2, 3])
+        journal.close()
+
+    def test_torn_line_without_newline_before_it(self):
+        with open(self.path, "wb") as f: # Crashed while writing the very first record
+            f.write(TORN)
+
+        journal = Journal(self.path)
+        journal.append({"op": "add", "seq": 1})
+
+        self.assertEqual(self.seqs(journal), [1])
+        journal.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+"""
+tests/test_notifications
+
+Author: Jake Hickey
+Description: Regression tests for reminders following their items through batches
+"""
+
+# Imports
+import sys, os, tempfile, unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from studytime.core import *
+from studytime.notifications import StubBackend
+
+class BatchReminderTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+        self.save = SaveInstance("reminders", self.directory.name)
+        self.save.add_task("Revise", datetime(2030, 3, 1, 9), "Chemistry")
+        self.item = self.save.search_date(datetime(2030, 3, 1))[0].id
+        self.save.set_notification(self.item, datetime(2030, 3, 1, 8), "Revise soon")
+
+    def tearDown(self):
+        self.save.close()
+        self.directory.cleanup()
+
+    def due(self) -> list:
+        return [reminder["due"] for reminder in self.save.get_item_notifications(self.item)]
+
+    def test_rolled_back_remove_keeps_reminders(self):
+        with self.assertRaises(RuntimeError):
+            with self.save.batch():
+                self.save.remove_item(self.item)
+                raise RuntimeError("bad line")
+
+        self.assertIsNotNone(self.save.get_item(self.item))
+        self.assertEqual(self.due(), ["2030-03-01T08:00:00"])
+
+    def test_rolled_back_edit_keeps_reminder_times(self):
+        with self.assertRaises(RuntimeError):
+            with self.save.batch():
+                self.save.edit_item(self.item, {"date": date(2030, 3, 8)})
+                raise RuntimeError("bad line")
+
+        self.assertEqual(self.due(), ["2030-03-01T08:00:00"])
+
+    def test_reminders_change_once_the_batch_is_stored(self):
+        with self.save.batch():
+            self.save.edit_item(self.item, {"date": date(2030, 3, 8)})
+            self.assertEqual(self.due(), ["2030-03-01T08:00:00"]) # Nothing is stored yet
+
+        self.assertEqual(self.due(), ["2030-03-08T08:00:00"])
+
+        with self.save.batch():
+            self.save.remove_item(self.item)
+
+        self.assertEqual(self.due(), [])
+
+class RecurringReminderTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+        self.save = SaveInstance("recurring", self.directory.name)
+        self.rule = self.save.add_recurring(datetime(2030, 3, 4, 9), Task("Chem", datetime(2030, 3, 4, 9), "Chemistry"))
+
+    def tearDown(self):
+        self.save.close()
+        self.directory.cleanup()
+
+    def test_removing_the_rule_keeps_edited_occurrence_reminders(self):
+        edited, untouched = f"{self.rule}@2030-03-04", f"{self.rule}@2030-03-11"
+
+        self.save.edit_item(edited, {"name": "Chem moved", "date": date(2030, 3, 5)})
+        self.save.set_notification(edited, datetime(2030, 3, 5, 8), "Bring goggles")
+        self.save.set_notification(untouched, datetime(2030, 3, 11, 8), "Bring goggles")
+
+        self.save.remove_rule(self.rule)
+
+        self.assertEqual(self.save.get_item(edited).name, "Chem moved")
+        self.assertEqual([reminder["due"] for reminder in self.save.get_item_notifications(edited)], ["2030-03-05T08:00:00"])
+        self.assertEqual(self.save.get_item_notifications(untouched), [])
+
+class SharedQueueTests(unittest.TestCase):
+    """
+    Two schedulers on one queue, standing in for the app and python -m studytime notify (or a cron job)
+    """
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "shared.notifications")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def scheduler(self, **kwargs) -> NotificationScheduler:
+        return NotificationScheduler(self.path, StubBackend(), **kwargs)
+
+    def test_daemon_fires_reminders_set_after_it_started(self):
+        daemon, app = self.scheduler(), self.scheduler()
+
+        app.schedule("revise", "Revise", "Chemistry", datetime(2020, 3, 1, 8))
+
+        self.assertEqual(daemon.fire_due(), 1)
+        self.assertEqual(app.fire_due(), 0) # Already shown by the daemon
+        self.assertEqual(daemon.backend.shown + app.backend.shown, [("Revise", "Chemistry")])
+
+        daemon.stop()
+        app.stop()
+
+    def test_compaction_keeps_the_other_process_changes(self):
+        app, cli = self.scheduler(threshold=1), self.scheduler(threshold=1) # Compacts on every change
+
+        cli.schedule("essay", "Essay", "English", datetime(2030, 3, 2, 8))
+        app.schedule("revise", "Revise", "Chemistry", datetime(2030, 3, 1, 8))
+        cli.schedule("quiz", "Quiz", "Maths", datetime(2030, 3, 3, 8)) # Through a journal the app has since replaced
+        self.assertTrue(cli.cancel("essay"))
+
+        app.stop()
+        cli.stop()
+
+        reloaded = self.scheduler()
+        self.assertEqual([reminder["key"] for reminder in reloaded.pending()], ["revise", "quiz"])
+        reloaded.stop()
+
+    def test_cancel_from_another_process(self):
+        app, cli = self.scheduler(), self.scheduler()
+
+        app.schedule("revise", "Revise", "Chemistry", datetime(2030, 3, 1, 8), item="abc")
+        self.assertEqual(cli.cancel_items(["abc"]), 1)
+
+        self.assertEqual(app.pending(), [])
+        app.stop()
+        cli.stop()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+tests/test_recurrence
+
+Author: Jake Hickey
+Description: Regression tests for recurring items at the edges of the calendar, over long ranges and through the command
+line tool
+"""
+
+# Imports
+import sys, os, contextlib, io, json, tempfile, unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from studytime.core import *
+
+from studytime import cli
+from studytime.storage import import_json_save
+
+class RecurrenceRangeTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.save = SaveInstance("recurring", self.directory.name)
+
+    def tearDown(self):
+        self.save.close()
+        self.directory.cleanup()
+
+    def test_december_9999(self):
+        self.save.add_recurring(datetime(9999, 12, 1, 9), Task("Class", datetime(9999, 12, 1, 9), "Maths"), frequency="daily")
+        self.save.add_recurring(datetime(9999, 12, 27, 10), Task("Tutorial", datetime(9999, 12, 27, 10), "Maths"), weekdays=[0, 6])
+
+        self.assertEqual([item.name for item in self.save.search_date(datetime(9999, 12, 31))], ["Class"])
+        self.assertEqual(len(self.save.search_range(datetime(9999, 12, 1), datetime(9999, 12, 31))), 31)
+        self.assertEqual(self.save.month_summary(9999, 12)[27]["items"], 2)
+
+    def test_long_range_only_expands_the_rule_months(self):
+        self.save.add_recurring(datetime(2020, 1, 6, 9), Task("Class", datetime(2020, 1, 6, 9), "Maths"), until=date(2020, 3, 1))
+
+        entries = self.save.search_range(datetime(1, 1, 1), datetime(9999, 12, 31))
+
+        self.assertEqual(len(entries), 8)
+        self.assertEqual(sorted(self.save.expanded), [(2020, 1), (2020, 2), (2020, 3)])
+
+class SqliteRecurrenceTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+        save = SaveInstance("recurring", self.directory.name)
+        save.add_task("Chem lab", datetime(2020, 3, 2, 9), "Chemistry")
+        save.add_recurring(datetime(2020, 3, 3, 10), Task("Chem class", datetime(2020, 3, 3, 10), "Chemistry"))
+        save.close()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_import_keeps_the_rules(self):
+        self.assertEqual(import_json_save("recurring", self.directory.name), 1)
+
+        save = SaveInstance("recurring", self.directory.name, backend="sqlite")
+
+        self.assertEqual([item.name for item in save.search_date(datetime(2020, 3, 10))], ["Chem class"])
+        self.assertEqual([result["name"] for result in save.search_name("chem")], ["Chem lab", "Chem class"])
+        save.close()
+
+class RecurringCommandLineTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+        save = SaveInstance("recurring", self.directory.name)
+        save.add_task("Essay", datetime(2020, 3, 2, 9), "English")
+        save.add_recurring(datetime(2020, 3, 3, 10), Task("Class", datetime(2020, 3, 3, 10), "Maths"), until=date(2020, 3, 24))
+        save.close()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_cli(self, *args, save: str = "recurring") -> list:
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.assertEqual(cli.main(["--save", save, "--dir", self.directory.name, *args]), 0)
+
+        return [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_list_and_stats_include_occurrences(self):
+        listed = self.run_cli("list", "--end", "2020-03-31")
+
+        self.assertEqual([line["date"] for line in listed], ["2020-03-02", "2020-03-03", "2020-03-10", "2020-03-17", "2020-03-24"])
+        self.assertEqual(self.run_cli("stats")[0]["items"], 5)
+
+    def test_export_and_import_keep_the_rules(self):
+        path = os.path.join(self.directory.name, "export.jsonl")
+        self.run_cli("export", path)
+
+        self.assertEqual(self.run_cli("import", path, save="copy"), [{"imported": 1, "rules": 1}])
+        self.assertEqual(self.run_cli("list", "--end", "2020-03-31", save="copy"), self.run_cli("list", "--end", "2020-03-31"))
+
+if __name__ == "__main__":
+    unittest.main()
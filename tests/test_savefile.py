@@ -0,0 +1,105 @@
+"""
+tests/test_savefile
+
+Author: Jake Hickey
+Description: Regression tests for reading years out of a save file that another process rewrites
+"""
+
+# Imports
+import sys, os, tempfile, unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from studytime.core import *
+
+import studytime.storage
+
+class RewrittenFileTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+        save = SaveInstance("race", self.directory.name, journal=False)
+        save.add_task("Revise", datetime(2020, 3, 1, 9), "Chemistry")
+        save.add_task("Essay", datetime(2021, 5, 2, 10), "English")
+        save.close()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def rewrite(self):
+        """
+        Stands in for another process: adds to the first year, which moves every later year's offset
+        """
+        other = SaveInstance("race", self.directory.name, journal=False)
+        other.add_task("Lab report " * 20, datetime(2020, 1, 1, 8), "Chemistry")
+        other.close()
+
+    def test_year_read_after_rewrite_past_stale_check(self):
+        save = SaveInstance("race", self.directory.name, journal=False)
+        self.rewrite()
+
+        checks = iter([False]) # The rewrite lands just after load_year has checked for it
+        save.storage.stale = lambda: next(checks, False)
+
+        names = [item.name for item in save.search_date(datetime(2021, 5, 2))]
+
+        self.assertEqual(names, ["Essay"])
+        self.assertEqual(len(save.search_date(datetime(2020, 1, 1))), 1) # Reloaded from the new file
+        save.close()
+
+    def test_read_chunks_refuses_a_different_file(self):
+        path = os.path.join(self.directory.name, "race.json")
+        header = read_header(path)
+        self.rewrite()
+
+        with self.assertRaises(FileChanged):
+            read_chunks(path, header["body"], header["years"], header["identity"])
+
+class DamagedFileTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "damaged.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_flipped_byte_in_a_year_restores_a_generation(self):
+        save = SaveInstance("damaged", self.directory.name, journal=False)
+        save.add_task("Revise", datetime(2020, 3, 1, 9), "Chemistry")
+        save.add_task("Essay", datetime(2020, 5, 2, 10), "English") # The file from before this is kept as a generation
+        save.close()
+
+        with open(self.path, "r+b") as f: # One flipped byte that still parses: "Essay" becomes "Esway"
+            content = f.read()
+            f.seek(content.index(b"Essay") + 2)
+            f.write(b"w")
+
+        save = SaveInstance("damaged", self.directory.name, journal=False)
+
+        self.assertEqual([item.name for item in save.search_date(datetime(2020, 3, 1))], ["Revise"])
+        self.assertEqual(save.search_date(datetime(2020, 5, 2)), []) # Only in the damaged file
+        self.assertTrue(os.path.exists(f"{self.path}.corrupt"))
+        save.close()
+
+    def test_failed_migration_keeps_the_original(self):
+        original = b'{"version":2,"seq":0,"dates":{"2020-03-01":[{"name":"Revise","time":"09:00:00","type":"Event"}]}}'
+        with open(self.path, "wb") as f:
+            f.write(original)
+
+        def crash(*args, **kwargs):
+            raise OSError("disk full")
+
+        write_atomic = studytime.storage.write_atomic
+        studytime.storage.write_atomic = crash
+
+        try:
+            with self.assertRaises(OSError):
+                SaveInstance("damaged", self.directory.name, journal=False)
+        finally:
+            studytime.storage.write_atomic = write_atomic
+
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), original)
+
+if __name__ == "__main__":
+    unittest.main()
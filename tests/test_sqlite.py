@@ -0,0 +1,132 @@
+"""
+tests/test_sqlite
+
+Author: Jake Hickey
+Description: Regression tests for the SQLite backend: changes surviving a reopen, rows from before item IDs and the
+search table, and spotting another connection's changes
+"""
+
+# Imports
+import sys, os, sqlite3, tempfile, unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from studytime.core import *
+
+class SqliteTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "items.db")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def open(self) -> SaveInstance:
+        return SaveInstance("items", self.directory.name, backend="sqlite")
+
+    def names(self, save: SaveInstance, day: datetime) -> list:
+        return [item.name for item in save.search_date(day)]
+
+    def searched(self, save: SaveInstance, query: str) -> list:
+        """
+        Names found by the trigram index alone, without falling back to the in-memory one
+        """
+        if not save.storage.searchable:
+            self.skipTest("this SQLite build has no FTS5 trigram support")
+
+        return [item.name for item, key in save.storage.search(query, 10) or []]
+
+    def make_old_database(self):
+        """
+        A database from before item IDs and the search table: no uid column, and no items_search
+        """
+        connection = sqlite3.connect(self.path)
+        connection.executescript("""
+            CREATE TABLE items (id INTEGER PRIMARY KEY, date TEXT NOT NULL, time TEXT NOT NULL, name TEXT NOT NULL,
+                                subject TEXT, type TEXT NOT NULL, completed TEXT);
+            INSERT INTO items (date, time, name, subject, type, completed) VALUES
+                ('2020-03-01', '09:00:00', 'Chemistry revision', 'Chemistry', 'Task', 'False'),
+                ('2020-03-01', '10:00:00', 'Assembly', NULL, 'Event', NULL);
+        """)
+        connection.commit()
+        connection.close()
+
+    def test_add_edit_and_remove_survive_reopening(self):
+        save = self.open()
+        save.add_task("Revise", datetime(2020, 3, 1, 9), "Chemistry")
+        save.add_event("Assembly", datetime(2020, 3, 1, 10))
+
+        revise = save.search_date(datetime(2020, 3, 1))[0].id
+        save.edit_item(revise, {"name": "Revise organic", "date": date(2020, 3, 2)})
+        save.remove_item(save.search_date(datetime(2020, 3, 1))[0].id)
+        save.close()
+
+        save = self.open()
+        self.assertEqual(self.names(save, datetime(2020, 3, 1)), [])
+        self.assertEqual(self.names(save, datetime(2020, 3, 2)), ["Revise organic"])
+        self.assertEqual(save.search_date(datetime(2020, 3, 2))[0].id, revise)
+        save.close()
+
+    def test_old_database_gets_ids_and_search(self):
+        self.make_old_database()
+
+        save = self.open()
+        self.assertEqual(self.searched(save, "chem"), ["Chemistry revision"]) # Indexed by the rebuild
+        save.close()
+
+        connection = sqlite3.connect(self.path)
+        self.assertIn("uid", [column[1] for column in connection.execute("PRAGMA table_info(items)")])
+        connection.close()
+
+    def test_editing_and_removing_rows_without_ids(self):
+        self.make_old_database()
+
+        save = self.open()
+        revision, assembly = save.search_date(datetime(2020, 3, 1))
+
+        save.edit_item(revision.id, {"name": "Organic revision"}) # Found by date, name and time instead
+        save.remove_item(assembly.id)
+
+        self.assertEqual(self.searched(save, "revision"), ["Organic revision"]) # Rebuilt rows are deleted from the index too
+        save.close()
+
+        save = self.open()
+        items = save.search_date(datetime(2020, 3, 1))
+
+        self.assertEqual([item.name for item in items], ["Organic revision"])
+        self.assertEqual(items[0].id, revision.id) # Saved with the ID it was given, for good
+        save.close()
+
+    def test_search_follows_edits_and_removals(self):
+        save = self.open()
+        save.add_task("Chemistry revision", datetime(2020, 3, 1, 9), "Chemistry")
+        save.add_task("Chemistry homework", datetime(2020, 3, 2, 9), "Chemistry")
+
+        revision, homework = save.search_date(datetime(2020, 3, 1))[0], save.search_date(datetime(2020, 3, 2))[0]
+        save.edit_item(revision.id, {"name": "Organic revision"})
+        save.remove_item(homework.id)
+
+        self.assertEqual(self.searched(save, "organic"), ["Organic revision"])
+        self.assertEqual(self.searched(save, "chemistry"), []) # Neither old name is left in the index
+
+        # Raises if the index has drifted from the table, e.g. a deleted row's name was never taken out
+        save.storage.connection.execute("INSERT INTO items_search (items_search, rank) VALUES ('integrity-check', 1)")
+        save.close()
+
+    def test_refresh_sees_another_connection(self):
+        app, cli = self.open(), self.open()
+
+        app.search_date(datetime(2020, 3, 1))
+        self.assertFalse(app.refresh())
+
+        cli.add_task("Essay", datetime(2020, 3, 1, 9), "English")
+
+        self.assertTrue(app.refresh())
+        self.assertEqual(self.names(app, datetime(2020, 3, 1)), ["Essay"])
+        self.assertFalse(app.refresh())
+
+        app.close()
+        cli.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+tests/test_storage
+
+Author: Jake Hickey
+Description: Regression tests for two processes (e.g. the app and the command line tool) changing the same save
+"""
+
+# Imports
+import sys, os, tempfile, unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from studytime.core import *
+
+class SharedSaveTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def names(self, **kwargs) -> list:
+        save = SaveInstance("shared", self.directory.name, **kwargs)
+        names = sorted(item.name for date in save.search_range(datetime(2020, 1, 1), datetime(2020, 12, 31))
+                       for item in date["data"])
+        save.close()
+
+        return names
+
+    def journal_seqs(self) -> list:
+        journal = Journal(os.path.join(self.directory.name, "shared.journal"))
+        return [record["seq"] for record in journal.records()]
+
+    def test_compaction_keeps_the_other_process_changes(self):
+        app = SaveInstance("shared", self.directory.name)
+        cli = SaveInstance("shared", self.directory.name)
+
+        app.add_task("Revise", datetime(2020, 3, 1, 9), "Chemistry")
+        cli.add_task("Essay", datetime(2020, 3, 2, 9), "English") # Neither has seen the other's change yet
+        app.add_task("Lab report", datetime(2020, 3, 3, 9), "Chemistry")
+
+        self.assertEqual(self.journal_seqs(), [1, 2, 3])
+
+        app.storage.compact(wait=True) # Snapshots and throws away the journal, which holds the other process's change
+        cli.add_task("Quiz", datetime(2020, 3, 4, 9), "Maths")
+
+        self.assertEqual(self.names(), ["Essay", "Lab report", "Quiz", "Revise"])
+        self.assertEqual(app.seq, 3)
+        self.assertEqual(cli.seq, 4)
+
+        app.close()
+        cli.close()
+
+    def test_snapshots_keep_the_other_process_changes(self):
+        app = SaveInstance("shared", self.directory.name, journal=False)
+        cli = SaveInstance("shared", self.directory.name, journal=False)
+
+        app.add_task("Revise", datetime(2020, 3, 1, 9), "Chemistry")
+        cli.add_task("Essay", datetime(2020, 3, 2, 9), "English")
+        app.add_task("Lab report", datetime(2020, 3, 3, 9), "Chemistry")
+
+        self.assertEqual(self.names(journal=False), ["Essay", "Lab report", "Revise"])
+
+        app.close()
+        cli.close()
+
+    def test_other_process_changes_show_up_in_memory(self):
+        app = SaveInstance("shared", self.directory.name)
+        cli = SaveInstance("shared", self.directory.name)
+
+        app.search_date(datetime(2020, 3, 1)) # Loaded, so the change below is applied rather than left pending
+        cli.add_task("Essay", datetime(2020, 3, 1, 9), "English")
+        app.add_task("Revise", datetime(2020, 3, 1, 10), "Chemistry")
+
+        self.assertEqual([item.name for item in app.search_date(datetime(2020, 3, 1))], ["Essay", "Revise"])
+        self.assertTrue(app.refresh()) # So the app knows to redraw
+        self.assertFalse(app.refresh())
+
+        app.close()
+        cli.close()
+
+if __name__ == "__main__":
+    unittest.main()